@@ -0,0 +1,73 @@
+"""Compare the vectorized reports with a plain loop over the history.
+
+Usage: python benchmarks/bench_analytics.py [rows]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from kamatis import analytics
+from kamatis.history import (
+    HistoryStore,
+    PeriodRecord,
+    )
+
+
+def naive(store):
+    heatmap = [[0] * 24 for _ in range(7)]
+    outcomes = dict((outcome, 0) for outcome in analytics.OUTCOMES)
+    for record in store.iter_query(period='work'):
+        local = time.localtime(record.start)
+        heatmap[local.tm_wday][local.tm_hour] += record.actual
+        outcomes[record.outcome] += 1
+    return heatmap, outcomes
+
+
+def vectorized(columns):
+    heatmap = analytics.heatmap(columns)
+    rates = analytics.outcome_rates(columns)
+    return heatmap, rates
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    tempdir = tempfile.mkdtemp()
+    path = os.path.join(tempdir, 'kamatis.sqlite')
+    store = HistoryStore(path)
+    store.open()
+    start = time.time() - rows * 1800
+    random.seed(0)
+    batch = []
+    for i in range(rows):
+        begin = start + i * 1800
+        period = 'work' if i % 2 == 0 else 'short break'
+        outcome = random.choice(analytics.OUTCOMES)
+        batch.append(PeriodRecord(begin, begin + 1500, period, outcome,
+                                  1500, 1500, 0))
+        if len(batch) == 100000:
+            store.insert(batch)
+            batch = []
+    store.insert(batch)
+
+    snapshot = analytics.ColumnarHistory(os.path.join(tempdir, 'columns'))
+    started = time.time()
+    snapshot.update(path)
+    print('snapshot: {:.2f} s'.format(time.time() - started))
+
+    started = time.time()
+    naive(store)
+    print('row loop: {:.2f} s'.format(time.time() - started))
+
+    started = time.time()
+    vectorized(snapshot.load())
+    print('vectorized: {:.3f} s'.format(time.time() - started))
+
+    store.close()
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Measure export throughput for every format.
+
+Usage: python benchmarks/bench_export.py [rows]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from kamatis.export import (
+    WRITERS,
+    export,
+    open_output,
+    )
+from kamatis.history import (
+    HistoryStore,
+    PeriodRecord,
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tempdir = tempfile.mkdtemp()
+    store = HistoryStore(os.path.join(tempdir, 'kamatis.sqlite'))
+    store.open()
+    start = time.time() - rows * 1800
+    for i in range(rows):
+        begin = start + i * 1800
+        store.add(PeriodRecord(begin, begin + 1500, 'work', 'finished',
+                               1500, 1500, 0))
+    store.flush()
+
+    for fmt in sorted(WRITERS):
+        for compress in (False, True):
+            path = os.path.join(tempdir, 'export.{}'.format(fmt))
+            started = time.time()
+            stream = open_output(path, compress)
+            count = export(store, stream, fmt)
+            stream.close()
+            elapsed = time.time() - started
+            print('{:<5} {:<7} {:.0f} rows/s, {} bytes'.format(
+                fmt, 'gzip' if compress else 'plain', count / elapsed,
+                os.path.getsize(path)))
+
+    store.close()
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
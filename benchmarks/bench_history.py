@@ -0,0 +1,51 @@
+"""Time date range queries on a history of many periods.
+
+Usage: python benchmarks/bench_history.py [rows]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from kamatis.history import (
+    HistoryStore,
+    PeriodRecord,
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tempdir = tempfile.mkdtemp()
+    store = HistoryStore(os.path.join(tempdir, 'kamatis.sqlite'))
+    store.open()
+
+    # Four years of pomodoros, evenly spread.
+    start = time.time() - 4 * 365 * 86400
+    step = 4 * 365 * 86400.0 / rows
+    periods = ('work', 'short break', 'work', 'long break')
+    started = time.time()
+    for i in range(rows):
+        begin = start + i * step
+        store.add(PeriodRecord(begin, begin + 1500, periods[i % 4],
+                               'finished', 1500, 1500, 0))
+    store.flush()
+    print('Wrote {} rows in {:.3f} s'.format(rows, time.time() - started))
+
+    for label, span in (('day', 86400), ('week', 7 * 86400)):
+        runs = 1000
+        found = 0
+        started = time.time()
+        for i in range(runs):
+            since = start + (i * 7919 % 1400) * 86400
+            found += len(store.query(since, since + span, period='work'))
+        elapsed = (time.time() - started) / runs
+        print('{} query: {:.3f} ms ({:.0f} rows on average)'.format(
+            label, elapsed * 1000, float(found) / runs))
+
+    store.close()
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Measure the import of a large CSV history of another tool.
+
+Usage: python benchmarks/bench_import.py [rows]
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from kamatis.history import HistoryStore
+from kamatis.importer import import_history
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tempdir = tempfile.mkdtemp()
+    path = os.path.join(tempdir, 'other.csv')
+    start = int(time.time()) - rows * 1800
+    with io.open(path, 'w') as f:
+        f.write(u'started_at,duration,type,status\n')
+        for i in range(rows):
+            kind = u'pomodoro' if i % 2 == 0 else u'break'
+            f.write(u'{},{},{},completed\n'.format(start + i * 1800, 1500,
+                                                   kind))
+
+    store = HistoryStore(os.path.join(tempdir, 'kamatis.sqlite'))
+    store.open()
+    for attempt in ('first', 'again'):
+        started = time.time()
+        with io.open(path, 'r', newline='') as f:
+            read, imported, _ = import_history(store, [f])
+        elapsed = time.time() - started
+        print('{}: {} rows read, {} imported in {:.2f} s'.format(
+            attempt, read, imported, elapsed))
+    store.close()
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
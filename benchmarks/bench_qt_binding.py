@@ -0,0 +1,59 @@
+"""Compare importing pyqtconfig with the lazy Qt binding and eagerly.
+
+Each way is timed in a fresh interpreter, along with the resident memory it
+ends up with. The eager way star-imports the four Qt modules the old shim in
+pyqtconfig/qt.py did. The best of a few runs is printed.
+
+Usage: python benchmarks/bench_qt_binding.py [runs]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import os, sys, time
+sys.path.insert(0, {root!r})
+started = time.time()
+{load}
+elapsed = time.time() - started
+with open('/proc/self/statm') as f:
+    rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+print('{{:.2f}} {{}} {{}}'.format(elapsed * 1000, rss,
+                                  'PyQt5.QtNetwork' in sys.modules))
+'''
+
+EAGER = '''
+from PyQt5.QtGui import *
+from PyQt5.QtCore import *
+from PyQt5.QtNetwork import *
+from PyQt5.QtWidgets import *
+from kamatis.ext import pyqtconfig
+'''
+
+LAZY = '''
+from kamatis.ext import pyqtconfig
+'''
+
+
+def run(load):
+    script = SCRIPT.format(root=ROOT, load=load)
+    output = subprocess.check_output([sys.executable, '-c', script])
+    elapsed, rss, network = output.decode().split()
+    return float(elapsed), int(rss), network == 'True'
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, load in (('eager', EAGER), ('lazy', LAZY)):
+        results = [run(load) for _ in range(runs)]
+        elapsed = min(result[0] for result in results)
+        rss = min(result[1] for result in results)
+        network = results[0][2]
+        print('{:<6} {:7.2f} ms {:8} KB RSS, QtNetwork {}'.format(
+            name, elapsed, rss, 'loaded' if network else 'not loaded'))
+
+
+if __name__ == '__main__':
+    main()
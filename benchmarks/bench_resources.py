@@ -0,0 +1,59 @@
+"""Compare loading resources from a pyrcc5 module and from res.rcc.
+
+Each way is timed in a fresh interpreter, along with the peak RSS it ends
+up with. The module is generated from res.qrc unless one is given, e.g. an
+old kamatis/res.py taken out of git.
+
+Usage: python benchmarks/bench_resources.py [res.py]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import resource, sys, time
+sys.path[:0] = {path!r}
+from PyQt5 import QtCore
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.time()
+{load}
+elapsed = time.time() - started
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+assert QtCore.QFile(':/kamatis.svg').exists()
+print('{{:.2f}} {{}}'.format(elapsed * 1000, after - before))
+'''
+
+
+def run(path, load):
+    script = SCRIPT.format(path=path, load=load)
+    output = subprocess.check_output([sys.executable, '-c', script])
+    elapsed, rss = output.decode().split()
+    return float(elapsed), int(rss)
+
+
+def main():
+    tempdir = tempfile.mkdtemp()
+    module = os.path.join(tempdir, 'res_module.py')
+    if len(sys.argv) > 1:
+        shutil.copy(sys.argv[1], module)
+    else:
+        subprocess.check_call(['pyrcc5', '-o', module, 'res.qrc'], cwd=ROOT)
+
+    cases = (
+        ('module, 1st run', tempdir, 'import res_module'),
+        ('module, 2nd run', tempdir, 'import res_module'),
+        ('res.rcc', ROOT,
+         'from kamatis import resources; resources.register()'),
+        )
+    for name, path, load in cases:
+        elapsed, rss = run([path], load)
+        print('{:<16} {:7.2f} ms, +{} KB peak RSS'.format(name, elapsed, rss))
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
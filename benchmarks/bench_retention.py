@@ -0,0 +1,63 @@
+"""Check that disk use and query time stay flat with compaction on.
+
+Writes years of a busy history, compacting once a day, and prints the
+database size and the time of a query of the last week at the end of each
+year.
+
+Usage: python benchmarks/bench_retention.py [years]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from kamatis.history import (
+    EventRecord,
+    HistoryStore,
+    PeriodRecord,
+    )
+
+PERIODS_PER_DAY = 24
+EVENTS_PER_PERIOD = 4
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    tempdir = tempfile.mkdtemp()
+    path = os.path.join(tempdir, 'kamatis.sqlite')
+    store = HistoryStore(path)
+    store.open()
+    start = time.time() - years * 365 * 86400
+
+    for day in range(years * 365):
+        begin = start + day * 86400
+        for i in range(PERIODS_PER_DAY):
+            period_start = begin + i * 1800
+            for j in range(EVENTS_PER_PERIOD):
+                store.add(EventRecord(period_start + j * 60, 'paused',
+                                      'work'))
+            store.add(PeriodRecord(period_start, period_start + 1500,
+                                   'work', 'finished', 1500, 1500, 1))
+        store.compact(event_days=30, period_days=365, now=begin + 86400)
+
+        if (day + 1) % 365 == 0:
+            store.flush()
+            now = begin + 86400
+            started = time.time()
+            store.query(since=now - 7 * 86400)
+            elapsed = time.time() - started
+            size = sum(os.path.getsize(path + suffix)
+                       for suffix in ('', '-wal')
+                       if os.path.exists(path + suffix))
+            print('year {}: {:.1f} MB, last week queried in {:.1f} ms, '
+                  '{} days of totals'.format(
+                      (day + 1) // 365, size / 1e6, elapsed * 1000,
+                      len(store.daily())))
+
+    store.close()
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Run many sessions on one scheduler and report throughput and memory.
+
+Usage: python benchmarks/bench_sessions.py [sessions] [hours]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from kamatis.sessions import SessionManager
+from kamatis.simulation import Simulator
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    simulator = Simulator()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    manager = SessionManager(scheduler=simulator.scheduler)
+    for session_id in range(count):
+        # Stagger the starts so transitions are spread out.
+        simulator.clock.now = session_id % 3600
+        manager.create(session_id, work=25, short_break=5, long_break=15,
+                       cycle=4)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    transitions = []
+    manager.period_changed.connect(
+        lambda session_id, period: transitions.append(None))
+    simulator.clock.now = 3600
+    started = time.time()
+    simulator.run_for(hours * 3600)
+    elapsed = time.time() - started
+
+    print('{} sessions, {:.0f} bytes per session'.format(
+        count, float(after - before) / count))
+    print('{} transitions in {:.3f} s ({:.0f} transitions/s)'.format(
+        len(transitions), elapsed, len(transitions) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
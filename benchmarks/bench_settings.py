@@ -0,0 +1,109 @@
+"""Measure QSettingsManager get, set and as_dict throughput.
+
+Compares the cached manager with reading through QSettings and munging the
+value on every call, as it did before. Settings go to an INI file in
+a temporary directory, with the app's keys and defaults.
+
+Usage: python benchmarks/bench_settings.py [rounds]
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import (
+    QCoreApplication,
+    QMutexLocker,
+    QSettings,
+    )
+
+from kamatis.ext.pyqtconfig import QSettingsManager
+
+DEFAULTS = {
+    'chosen_sound': 'NO_SOUND',
+    'work': 25,
+    'short_break': 5,
+    'long_break': 15,
+    'cycle': 4,
+    'autostart': True,
+    'sleep_policy': 'pause',
+    'event_retention_days': 30,
+    'period_retention_days': 730,
+    'search_dir': '/home/user/Music',
+    'sound_entries': [('No sounds', 'NO_SOUND'), (None, 'SEPARATOR')],
+    }
+
+
+class UncachedQSettingsManager(QSettingsManager):
+    """The manager as it was, reading and munging on every get."""
+
+    def _get(self, key):
+        with QMutexLocker(self.mutex):
+            v = self.settings.value(key, None)
+            if v is None:
+                return None
+            vt = type(v)
+            if key in self.defaults:
+                dt = type(self.defaults[key])
+                if vt != dt and issubclass(vt, str):
+                    type_munge = {
+                        int: lambda x: int(x),
+                        float: lambda x: float(x),
+                        str: lambda x: str(x),
+                        bool: lambda x: x.lower() == u'true',
+                        }
+                    v = type_munge[dt](v)
+                v = dt(v)
+            return v
+
+    def _set(self, key, value):
+        with QMutexLocker(self.mutex):
+            self.settings.setValue(key, value)
+
+
+def measure(manager, rounds):
+    keys = sorted(DEFAULTS)
+    started = time.process_time()
+    for _ in range(rounds):
+        for key in keys:
+            manager.get(key)
+    get_rate = rounds * len(keys) / (time.process_time() - started)
+
+    started = time.process_time()
+    for i in range(rounds):
+        manager.set('work', 20 + i % 10)
+    set_rate = rounds / (time.process_time() - started)
+
+    started = time.process_time()
+    for _ in range(rounds // 10):
+        manager.as_dict()
+    as_dict_rate = (rounds // 10) / (time.process_time() - started)
+    return get_rate, set_rate, as_dict_rate
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = QCoreApplication(sys.argv[:1])  # noqa
+    tempdir = tempfile.mkdtemp()
+    QCoreApplication.setOrganizationName('KamatisBenchmark')
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, tempdir)
+    try:
+        for name, cls in (
+                ('uncached', UncachedQSettingsManager),
+                ('cached', QSettingsManager),
+                ):
+            manager = cls()
+            manager.set_defaults(DEFAULTS)
+            manager.set_many(DEFAULTS)
+            manager.sync()
+            get_rate, set_rate, as_dict_rate = measure(manager, rounds)
+            manager.sync()
+            print('{:<9} get {:9.0f}/s  set {:8.0f}/s  as_dict {:7.0f}/s'
+                  .format(name, get_rate, set_rate, as_dict_rate))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
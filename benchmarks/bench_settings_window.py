@@ -0,0 +1,102 @@
+"""Measure what the settings window costs at startup and while kept around.
+
+Starts the app in a fresh interpreter with a throwaway home directory, then
+opens, closes, releases and reopens the settings window, printing the time
+taken, the resident memory and the live widgets after each step. Building
+the window at startup, as before, costs what the first opening does here.
+
+Releasing the window deletes its widgets but gives little memory back, even
+after glibc's malloc_trim where there is one: most of it is Qt's style, font
+and plugin state, loaded once and reused when the window is opened again.
+The saving is at startup for sessions that never open the settings.
+
+Usage: python benchmarks/bench_settings_window.py
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import ctypes, ctypes.util, gc, os, sys, time
+sys.path.insert(0, {root!r})
+page_size = os.sysconf('SC_PAGE_SIZE')
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * page_size // 1024
+
+def settings_windows():
+    return [widget for widget in QApplication.topLevelWidgets()
+            if widget.windowTitle().endswith('Settings')]
+
+def report(name, started):
+    print('{{:<22}} {{:8.2f}} ms {{:8}} KB RSS {{:4}} widgets'.format(
+        name, (time.time() - started) * 1000, rss(),
+        len(QApplication.allWidgets())))
+
+started = time.time()
+from PyQt5.QtCore import QCoreApplication, QEvent
+from PyQt5.QtWidgets import QApplication
+from kamatis.app import Kamatis
+Kamatis.SETTINGS_WINDOW_KEEP = 0
+report('imports', started)
+
+started = time.time()
+app = Kamatis(sys.argv[:1])
+app.processEvents()
+report('startup (tray shown)', started)
+
+started = time.time()
+app.show_settings()
+app.processEvents()
+report('open settings', started)
+
+started = time.time()
+for widget in settings_windows():
+    widget.close()
+# The release timer and the deferred delete take a few event loop turns.
+deadline = time.time() + 1
+while settings_windows() and time.time() < deadline:
+    app.processEvents()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+gc.collect()
+report('close and release', started)
+
+libc = ctypes.util.find_library('c')
+malloc_trim = getattr(ctypes.CDLL(libc), 'malloc_trim', None) if libc else None
+if malloc_trim is not None:
+    started = time.time()
+    malloc_trim(0)
+    report('malloc_trim', started)
+
+started = time.time()
+app.show_settings()
+app.processEvents()
+report('open settings again', started)
+'''
+
+
+def main():
+    home = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env.update(
+        HOME=home,
+        XDG_CONFIG_HOME=os.path.join(home, '.config'),
+        XDG_DATA_HOME=os.path.join(home, '.local', 'share'),
+        )
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        subprocess.check_call(
+            [sys.executable, '-c', SCRIPT.format(root=ROOT)],
+            env=env,
+            )
+    finally:
+        shutil.rmtree(home)
+
+
+if __name__ == '__main__':
+    main()
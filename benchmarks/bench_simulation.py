@@ -0,0 +1,39 @@
+"""Simulate many pomodoro cycles on a virtual clock.
+
+Usage: python benchmarks/bench_simulation.py [cycles]
+"""
+import sys
+import time
+
+from kamatis.simulation import Simulator
+
+
+def run(cycles, track_progress):
+    simulator = Simulator()
+    engine = simulator.engine(work=25, short_break=5, long_break=15, cycle=4)
+    transitions = []
+    engine.period_changed.connect(transitions.append)
+    if track_progress:
+        engine.period_progressed.connect(lambda progress: None)
+
+    # One cycle is five work periods, four short breaks and a long break.
+    cycle_secs = (5 * 25 + 4 * 5 + 15) * 60
+    engine.start()
+    started = time.time()
+    simulator.run_for(cycles * cycle_secs)
+    elapsed = time.time() - started
+
+    label = 'with progress' if track_progress else 'without progress'
+    print('{:<17} {} cycles, {} transitions in {:.3f} s ({:.0f}/s)'
+          .format(label, cycles, len(transitions), elapsed,
+                  len(transitions) / elapsed))
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run(cycles, False)
+    run(cycles, True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compare rollup lookups against rescanning the history.
+
+Usage: python benchmarks/bench_stats.py [rows]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from kamatis.history import (
+    HistoryStore,
+    PeriodRecord,
+    )
+from kamatis.stats import Rollups
+
+
+def rescan(store, now):
+    # What the stats would cost without rollups.
+    today = time.localtime(now)
+    midnight = time.mktime(today[:3] + (0, 0, 0) + today[6:])
+    pomodoros = focus = 0
+    for record in store.query(since=midnight, period='work'):
+        pomodoros += record.outcome == 'finished'
+        focus += record.actual
+    days = set()
+    for record in store.query(period='work'):
+        if record.outcome == 'finished':
+            days.add(time.strftime('%Y-%m-%d', time.localtime(record.start)))
+    return pomodoros, focus, len(days)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tempdir = tempfile.mkdtemp()
+    store = HistoryStore(os.path.join(tempdir, 'kamatis.sqlite'))
+    store.open()
+
+    now = time.time()
+    start = now - rows * 1800
+    for i in range(rows):
+        begin = start + i * 1800
+        store.add(PeriodRecord(begin, begin + 1500, 'work', 'finished',
+                               1500, 1500, 0))
+    store.flush()
+
+    started = time.time()
+    rollups = Rollups.from_history(store)
+    print('Loaded rollups of {} rows in {:.3f} ms'.format(
+        rows, (time.time() - started) * 1000))
+
+    runs = 10000
+    started = time.time()
+    for _ in range(runs):
+        rollups.day(now)
+        rollups.week(now)
+        rollups.month(now)
+        rollups.streak(now)
+    print('Rollup lookup: {:.4f} ms'.format(
+        (time.time() - started) * 1000 / runs))
+
+    runs = 10
+    started = time.time()
+    for _ in range(runs):
+        rescan(store, now)
+    print('Full rescan: {:.4f} ms'.format(
+        (time.time() - started) * 1000 / runs))
+
+    started = time.time()
+    store.rebuild_daily()
+    print('Rebuilt daily totals in {:.3f} ms'.format(
+        (time.time() - started) * 1000))
+
+    store.close()
+    shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Measure fuzzy task name lookups as the user types.
+
+Usage: python benchmarks/bench_tasks.py [names]
+"""
+import random
+import string
+import sys
+import time
+
+from kamatis.tasks import TaskIndex
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(0)
+    words = [''.join(random.choice(string.ascii_lowercase)
+                     for _ in range(random.randint(3, 9)))
+             for _ in range(500)]
+    names = [' '.join(random.sample(words, random.randint(1, 4)))
+             for _ in range(count)]
+
+    started = time.time()
+    index = TaskIndex(names)
+    print('build: {:.1f} ms for {} names'.format(
+        (time.time() - started) * 1000, len(index)))
+
+    queries = []
+    for name in random.sample(names, 200):
+        queries.extend(name[:i] for i in range(1, len(name) + 1))
+    started = time.time()
+    for query in queries:
+        index.search(query)
+    elapsed = time.time() - started
+    print('search: {:.3f} ms per keystroke'.format(
+        elapsed * 1000 / len(queries)))
+
+
+if __name__ == '__main__':
+    main()
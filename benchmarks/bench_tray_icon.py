@@ -0,0 +1,64 @@
+"""Measure the CPU time of a tray icon progress step.
+
+Compares rendering every size of the icon on every step with the frame
+cache, which renders a frame once and skips steps that look the same. Runs
+without a display.
+
+Usage: python benchmarks/bench_tray_icon.py [steps] [rounds]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication  # noqa
+
+from kamatis import resources  # noqa
+from kamatis.icon_cache import (  # noqa
+    ICON_SIZES,
+    IconCache,
+    )
+from kamatis.icon_renderer import IconRenderer  # noqa
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    app = QApplication(sys.argv[:1])  # noqa
+    resources.register()
+    renderer = IconRenderer()
+    cache = IconCache(renderer)
+
+    def step_uncached(variant, fraction):
+        for size in ICON_SIZES:
+            renderer.render(variant, renderer.get_frame(fraction, size),
+                            size)
+
+    shown = [None, 0]
+
+    def step_cached(variant, fraction):
+        icon = cache.icon(variant, fraction, 1.0)
+        if icon is not shown[0]:
+            shown[0] = icon
+            shown[1] += 1
+
+    for name, step_once, count in (
+            ('uncached', step_uncached, rounds),
+            ('cold', step_cached, 1),
+            ('cached', step_cached, rounds),
+            ):
+        started = time.process_time()
+        for _ in range(count):
+            for variant in ('normal', 'paused'):
+                for step in range(steps):
+                    step_once(variant, float(step) / steps)
+        elapsed = time.process_time() - started
+        print('{:<9} {:.3f} ms CPU per step'.format(
+            name, elapsed * 1000 / (count * 2 * steps)))
+    print('icon changes: {} of {} steps'.format(
+        shown[1], (rounds + 1) * 2 * steps))
+
+
+if __name__ == '__main__':
+    main()
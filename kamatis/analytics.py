@@ -0,0 +1,229 @@
+"""Vectorized reports over a columnar snapshot of the history.
+
+Needs NumPy, which is optional for the rest of Kamatis.
+"""
+import calendar
+import os
+import sqlite3
+import time
+
+import numpy
+
+
+PERIODS = ('work', 'short break', 'long break')
+OUTCOMES = ('finished', 'skipped', 'reset')
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+class ColumnarHistory(object):
+    """Snapshot of the history as one fixed-width array file per column.
+
+    The files are raw little-endian arrays, so new rows are simply appended
+    and the columns are memory-mapped instead of read. Rows are kept in the
+    order of their id in the history database, not by start time.
+    """
+
+    COLUMNS = (
+        ('id', '<i8'),
+        ('start', '<f8'),
+        ('actual', '<f4'),
+        ('period', 'u1'),
+        ('outcome', 'u1'),
+        )
+
+    # Rows fetched from SQLite at a time.
+    CHUNK_SIZE = 100000
+
+    def __init__(self, path):
+        self.__path = path
+
+    @property
+    def path(self):
+        return self.__path
+
+    def __get_file(self, name):
+        return os.path.join(self.__path, '{}.bin'.format(name))
+
+    def __len__(self):
+        # A crash while appending may leave some columns longer than others.
+        lengths = []
+        for name, dtype in self.COLUMNS:
+            try:
+                size = os.path.getsize(self.__get_file(name))
+            except OSError:
+                return 0
+            lengths.append(size // numpy.dtype(dtype).itemsize)
+        return min(lengths)
+
+    def load(self):
+        """Return a dict of read-only memory-mapped columns."""
+        length = len(self)
+        columns = {}
+        for name, dtype in self.COLUMNS:
+            if length:
+                columns[name] = numpy.memmap(self.__get_file(name),
+                                             dtype=dtype, mode='r',
+                                             shape=(length,))
+            else:
+                columns[name] = numpy.zeros(0, dtype=dtype)
+        return columns
+
+    def update(self, database):
+        """Append the rows added to `database` since the last update.
+
+        Rows deleted from the database, as compaction does with old days,
+        are dropped from the snapshot without reading the others again.
+        Returns the number of rows added.
+        """
+        if not os.path.isdir(self.__path):
+            os.makedirs(self.__path)
+        length = len(self)
+        last_id = int(self.load()['id'][-1]) if length else 0
+
+        connection = sqlite3.connect(database)
+        try:
+            count = connection.execute(
+                'SELECT COUNT(*) FROM periods WHERE id <= ?', (last_id,),
+                ).fetchone()[0]
+            if count != length:
+                length = self.__prune(connection, last_id)
+                if count != length:
+                    # Rows were added below the last id, start over.
+                    length = last_id = 0
+            self.__truncate(length)
+
+            cursor = connection.execute(
+                'SELECT id, start, actual, period, outcome FROM periods '
+                'WHERE id > ? ORDER BY id',
+                (last_id,),
+                )
+            added = 0
+            while True:
+                rows = cursor.fetchmany(self.CHUNK_SIZE)
+                if not rows:
+                    break
+                self.__append(rows)
+                added += len(rows)
+        finally:
+            connection.close()
+        return added
+
+    def __prune(self, connection, last_id):
+        """Drop the rows no longer in the database, returning those left.
+
+        Only the ids are read from the database, from its primary key.
+        """
+        cursor = connection.execute(
+            'SELECT id FROM periods WHERE id <= ? ORDER BY id', (last_id,))
+        ids = numpy.fromiter((row[0] for row in cursor), dtype='<i8')
+        columns = self.load()
+        kept = numpy.isin(columns['id'], ids, assume_unique=True)
+        for name, dtype in self.COLUMNS:
+            path = self.__get_file(name)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(columns[name][kept].tobytes())
+            os.rename(path + '.tmp', path)
+        return int(kept.sum())
+
+    def __truncate(self, length):
+        for name, dtype in self.COLUMNS:
+            with open(self.__get_file(name), 'ab') as f:
+                f.truncate(length * numpy.dtype(dtype).itemsize)
+
+    def __append(self, rows):
+        ids, starts, actuals, periods, outcomes = zip(*rows)
+        period_codes = dict((name, i) for i, name in enumerate(PERIODS))
+        outcome_codes = dict((name, i) for i, name in enumerate(OUTCOMES))
+        values = {
+            'id': ids,
+            'start': starts,
+            'actual': actuals,
+            'period': [period_codes[period] for period in periods],
+            'outcome': [outcome_codes[outcome] for outcome in outcomes],
+            }
+        for name, dtype in self.COLUMNS:
+            array = numpy.asarray(values[name], dtype=dtype)
+            with open(self.__get_file(name), 'ab') as f:
+                f.write(array.tobytes())
+
+
+def __get_utc_offset(timestamp):
+    return calendar.timegm(time.localtime(timestamp)) - int(timestamp)
+
+
+def get_local_time(starts):
+    """Convert Unix timestamps to seconds since the epoch in local time.
+
+    The UTC offset is looked up once per day that appears in `starts`, and
+    once per hour on days where it changes.
+    """
+    if not len(starts):
+        return numpy.zeros(0)
+    days = numpy.floor_divide(starts, 86400).astype(numpy.int64)
+    first = days.min()
+    index = days - first
+    present = numpy.flatnonzero(numpy.bincount(index))
+    day_offsets = numpy.zeros(index.max() + 2)
+    for day in numpy.union1d(present, present + 1):
+        day_offsets[day] = __get_utc_offset(int(first + day) * 86400)
+    offsets = day_offsets[index]
+
+    changing = present[day_offsets[present] != day_offsets[present + 1]]
+    if len(changing):
+        selected = numpy.isin(index, changing)
+        hours = numpy.floor_divide(starts[selected], 3600).astype(numpy.int64)
+        unique, inverse = numpy.unique(hours, return_inverse=True)
+        hour_offsets = numpy.array([__get_utc_offset(int(hour) * 3600)
+                                    for hour in unique])
+        offsets[selected] = hour_offsets[inverse]
+    return starts + offsets
+
+
+def __select(columns, period):
+    if period is None:
+        return numpy.ones(len(columns['period']), dtype=bool)
+    return columns['period'] == PERIODS.index(period)
+
+
+def heatmap(columns, period='work'):
+    """Return a 7x24 array of seconds spent by weekday and hour.
+
+    Rows start on Monday. A period counts entirely towards the hour it
+    started in.
+    """
+    selected = __select(columns, period)
+    local = get_local_time(columns['start'][selected])
+    days = numpy.floor_divide(local, 86400).astype(numpy.int64)
+    # 1970-01-01 was a Thursday.
+    weekdays = (days + 3) % 7
+    hours = ((local - days * 86400) // 3600).astype(numpy.int64)
+    totals = numpy.bincount(weekdays * 24 + hours,
+                            weights=columns['actual'][selected],
+                            minlength=7 * 24)
+    return totals.reshape(7, 24)
+
+
+def count(columns, period='work'):
+    return int(__select(columns, period).sum())
+
+
+def outcome_rates(columns, period='work'):
+    """Return the share of periods that were finished, skipped and reset."""
+    outcomes = columns['outcome'][__select(columns, period)]
+    counts = numpy.bincount(outcomes, minlength=len(OUTCOMES))
+    total = counts.sum()
+    if not total:
+        return dict((outcome, 0.0) for outcome in OUTCOMES)
+    return dict((outcome, float(count) / total)
+                for outcome, count in zip(OUTCOMES, counts))
+
+
+def completion_ratio(columns, period='work'):
+    return outcome_rates(columns, period)['finished']
+
+
+def interruption_rate(columns, period='work'):
+    """Return the share of periods that were skipped or reset."""
+    rates = outcome_rates(columns, period)
+    return rates['skipped'] + rates['reset']
@@ -1,30 +1,44 @@
 from PyQt5.QtCore import (
     pyqtSignal,
+    pyqtSlot,
+    Qt,
+    QSocketNotifier,
     QStandardPaths,
     QTimer,
     QUrl,
     )
-from PyQt5.QtMultimedia import (
-    QMediaContent,
-    QMediaPlayer,
-    )
 from PyQt5.QtWidgets import (
     QApplication,
     QSystemTrayIcon,
     )
 from textwrap import dedent
 import logging
+import math
 import os
 import signal
+import socket
+import sqlite3
 import sys
+import time
 
-from kamatis import res  # noqa
+from kamatis import resources
 from kamatis import util
+from kamatis.clock import SleepDetector
+from kamatis.engine import TimerEngine
+from kamatis.history import (
+    HistoryRecorder,
+    HistoryStore,
+    get_day,
+    )
+from kamatis.journal import Journal
+from kamatis.profiling import NULL_PROFILE
+from kamatis.scheduler import Scheduler
+from kamatis.stats import Rollups
+from kamatis.tasks import TaskIndex
 from kamatis.ext.pyqtconfig import (
     ConfigManager,
     QSettingsManager,
     )
-from kamatis.settings_window import SettingsWindow
 from kamatis.tray_icon import TrayIcon
 
 
@@ -49,54 +63,100 @@ class Kamatis(QApplication):
     timer_updated = pyqtSignal(str)
     period_progressed = pyqtSignal(int)
 
+    # Steps of the tray icon progress in a period.
+    PERIOD_STEPS = 60
+
+    # How long a closed settings window is kept around for reopening, in
+    # milliseconds.
+    SETTINGS_WINDOW_KEEP = 60 * 1000
+
     NO_SOUND_VALS = (
         'NO_SOUND',
         'SEPARATOR',
         'CHOOSE',
         )
 
-    def __init__(self, *args):
-        super(Kamatis, self).__init__(*args)
+    def __init__(self, *args, **kwargs):
+        # A StartupProfile to time the phases of startup with.
+        profile = kwargs.pop('profile', NULL_PROFILE)
+        # Clock of the timer, in seconds. Tests pass a fake one.
+        clock = kwargs.pop('clock', None)
+        with profile.phase('qapplication'):
+            super(Kamatis, self).__init__(*args, **kwargs)
+        with profile.phase('resources'):
+            if not resources.register():
+                logging.warning('Cannot load resources.')
         self.setOrganizationName('Fumisoft')
         self.setApplicationName(self.__application_name)
         self.setQuitOnLastWindowClosed(False)
 
-        self.__setup_logging()
-
-        self.__player = QMediaPlayer(self)
-
-        self.__period_steps = 12
-        self.period_changed.connect(self.__start_timer)
-        self.period_changed.connect(self.__start_progress_timer)
-
-        self.__work_timer = QTimer(self)
-        self.__work_timer.setSingleShot(True)
-        self.__work_timer.timeout.connect(self.__start_break)
-        self.__work_timer.timeout.connect(self.__play_sound)
-
-        self.__break_timer = QTimer(self)
-        self.__break_timer.setSingleShot(True)
-        self.__break_timer.timeout.connect(self.__start_work)
-        self.__break_timer.timeout.connect(self.__play_sound)
-
-        self.__progress_timer = QTimer(self)
-        self.__progress_timer.setSingleShot(True)
-        self.__progress_timer.timeout.connect(self.__start_progress_timer)
-
-        self.__saved_settings = QSettingsManager()
-        self.__load_default_settings()
-        self.settings = ConfigManager()
-        self.settings.set_defaults(self.__saved_settings.as_dict())
-
-        self.settings_window = SettingsWindow()
-        self.settings_window.settings_set.connect(self.__apply_settings)
+        with profile.phase('logging'):
+            # The startup profile may be written to stdout, keep the log
+            # out of it.
+            self.__setup_logging(sys.stderr if profile else sys.stdout)
 
-        self.__tray_icon = TrayIcon(self)
-        self.__tray_icon.show()
+        # QtMultimedia is only loaded once a sound has to play.
+        self.__player = None
+        self.__sound_file_path = ''
 
-        self.__init_state()
-
-    def __setup_logging(self):
+        self.__scheduler = Scheduler(clock)
+        self.__engine = TimerEngine(
+            period_steps=self.PERIOD_STEPS,
+            scheduler=self.__scheduler,
+            )
+        self.__engine.state_changed.connect(self.state_changed.emit)
+        self.__engine.period_changed.connect(self.period_changed.emit)
+        self.__engine.timer_updated.connect(self.timer_updated.emit)
+        self.__engine.period_progressed.connect(self.period_progressed.emit)
+        self.__engine.period_ended.connect(self.__on_period_ended)
+        self.__engine.transitioned.connect(self.__on_transitioned)
+
+        self.__journal = None
+        self.__journal_timer = QTimer(self)
+        self.__journal_timer.setSingleShot(True)
+        self.__journal_timer.setTimerType(Qt.CoarseTimer)
+        self.__journal_timer.setInterval(2000)
+        self.__journal_timer.timeout.connect(self.__sync_journal)
+        self.aboutToQuit.connect(self.__close_journal)
+
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.__on_timeout)
+
+        self.__sleep_detector = SleepDetector()
+        self.__watch_sleep()
+
+        with profile.phase('settings'):
+            self.__saved_settings = QSettingsManager()
+            self.aboutToQuit.connect(self.__saved_settings.sync)
+            self.__load_default_settings()
+            self.settings = ConfigManager()
+            self.settings.set_defaults(self.__saved_settings.as_dict())
+
+        # Built when first shown and released a while after it is closed,
+        # see show_settings().
+        self.__settings_window = None
+        self.__settings_window_timer = QTimer(self)
+        self.__settings_window_timer.setSingleShot(True)
+        self.__settings_window_timer.setTimerType(Qt.VeryCoarseTimer)
+        self.__settings_window_timer.setInterval(self.SETTINGS_WINDOW_KEEP)
+        self.__settings_window_timer.timeout.connect(
+            self.__release_settings_window)
+
+        with profile.phase('history'):
+            self.__init_history()
+
+        # Includes rendering the first icon.
+        with profile.phase('tray_icon'):
+            self.__tray_icon = TrayIcon(self)
+        with profile.phase('tray_icon_show'):
+            self.__tray_icon.show()
+
+        with profile.phase('state'):
+            self.__init_state()
+            self.__init_journal()
+
+    def __setup_logging(self, stream):
         logging.root.setLevel(logging.WARNING)
         formatter = logging.Formatter(
             '%(levelname)-8s %(asctime)s [%(module)s:%(funcName)s:%(lineno)s] '
@@ -111,13 +171,15 @@ class Kamatis(QApplication):
             # https://doc.qt.io/qt-5/qstandardpaths.html#StandardLocation-enum
             location_type = QStandardPaths.DataLocation
         data_dir = QStandardPaths.standardLocations(location_type)[0]
+        self.__data_dir = None
 
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = logging.StreamHandler(stream)
         console_handler.setFormatter(formatter)
         logging.root.addHandler(console_handler)
 
         isdir = util.makedirs(data_dir)
         if isdir:
+            self.__data_dir = data_dir
             log_file = os.path.join(
                 data_dir,
                 '{}.log'.format(self.__application_name.lower())
@@ -128,20 +190,94 @@ class Kamatis(QApplication):
 
     def __init_state(self):
         self.__apply_settings()
-        self.__set_state('STOPPED')
-        self.__period_counter = 0
-        self.__progress = -1
-
-    def __set_state(self, new_state):
-        self.__state = new_state
-        self.state_changed.emit(new_state)
-
-    def __set_period(self, new_period):
-        self.__period = new_period
-        length = self.__saved_settings.get(new_period.replace(' ', '_'))
-        # Length is saved in minutes but QTimer accepts milliseconds.
-        self.__timer_length = length * 60 * 1000
-        self.period_changed.emit(new_period)
+        self.__engine.reset()
+        self.__arm_timer()
+
+    def __init_history(self):
+        self.history = None
+        self.stats = Rollups()
+        self.task = None
+        # Built on first use, see get_task_index().
+        self.__task_index = None
+        self.__history_recorder = None
+        if self.__data_dir is None:
+            return
+        path = os.path.join(
+            self.__data_dir,
+            '{}.sqlite'.format(self.__application_name.lower()),
+            )
+        history = HistoryStore(path)
+        try:
+            history.open()
+        except sqlite3.Error:
+            logging.warning('Cannot open history.', exc_info=True)
+            return
+        self.history = history
+        self.stats = Rollups.from_history(history)
+        self.__history_recorder = HistoryRecorder(
+            self.__engine,
+            self.__on_period_recorded,
+            event_callback=history.add,
+            )
+        self.aboutToQuit.connect(history.close)
+
+        # Compaction runs on the history writer thread. It is asked for once
+        # after startup and then on the first period recorded each day, not
+        # on a timer that would wake up while stopped.
+        self.__compacted_day = None
+        QTimer.singleShot(60 * 1000, self.__compact_history)
+
+    def __compact_history(self):
+        event_days = self.__saved_settings.get('event_retention_days')
+        period_days = self.__saved_settings.get('period_retention_days')
+        self.history.compact(event_days or None, period_days or None)
+        self.__compacted_day = get_day(time.time())
+
+    def __on_period_recorded(self, record):
+        self.history.add(record)
+        if get_day(record.end) != self.__compacted_day:
+            self.__compact_history()
+        self.stats.add(record)
+        if record.task and self.__task_index is not None:
+            self.__task_index.add(record.task)
+
+    def __init_journal(self):
+        if self.__data_dir is None:
+            return
+        path = os.path.join(
+            self.__data_dir,
+            '{}.journal'.format(self.__application_name.lower()),
+            )
+        journal = Journal(path)
+        record = journal.load()
+        if record is not None:
+            wall_time, snapshot = record
+            state, period, period_counter, remaining, length = snapshot
+            if state == 'RUNNING':
+                # The period went on while the app was not running.
+                remaining -= max(0, time.time() - wall_time)
+            self.__engine.restore(state, period, period_counter, remaining,
+                                  length)
+            self.__arm_timer()
+
+        self.__journal = journal
+        journal.append(self.__engine.snapshot())
+        journal.compact()
+
+    def __on_transitioned(self):
+        if self.__journal is None:
+            return
+        self.__journal.append(self.__engine.snapshot())
+        # Batch the fsyncs instead of doing one per transition.
+        if not self.__journal_timer.isActive():
+            self.__journal_timer.start()
+
+    def __sync_journal(self):
+        self.__journal.sync()
+
+    def __close_journal(self):
+        if self.__journal is not None:
+            self.__journal.close()
 
     def __load_default_settings(self):
         location_type = QStandardPaths.MusicLocation
@@ -165,6 +301,10 @@ class Kamatis(QApplication):
             'long_break': 15,
             'cycle': 4,
             'autostart': True,
+            'sleep_policy': 'pause',
+            # 0 keeps them forever.
+            'event_retention_days': 30,
+            'period_retention_days': 730,
             }
 
         self.__saved_settings.set_defaults(self.sound_settings)
@@ -173,7 +313,18 @@ class Kamatis(QApplication):
     def __apply_settings(self):
         self.__set_autostart()
         self.__load_sound_file()
-        self.__set_cycle_length()
+        self.__configure_engine()
+
+    def __on_settings_set(self):
+        self.__apply_settings()
+        self.__settings_window_timer.start()
+
+    def __release_settings_window(self):
+        window = self.__settings_window
+        if window is None or window.isVisible():
+            return
+        self.__settings_window = None
+        window.release()
 
     def __set_autostart(self):
         autostart_dir = os.path.expanduser('~/.config/autostart')
@@ -231,56 +382,100 @@ class Kamatis(QApplication):
         sound_file_path = self.__saved_settings.get('chosen_sound')
         if sound_file_path in self.NO_SOUND_VALS:
             sound_file_path = ''
-        media_content = QMediaContent(QUrl.fromLocalFile(sound_file_path))
-        self.__player.setMedia(media_content)
+        if sound_file_path == self.__sound_file_path:
+            return
+        self.__sound_file_path = sound_file_path
+        if self.__player is not None:
+            self.__set_media()
+
+    def __set_media(self):
+        from PyQt5.QtMultimedia import QMediaContent
+
+        url = QUrl.fromLocalFile(self.__sound_file_path)
+        self.__player.setMedia(QMediaContent(url))
+
+    def __configure_engine(self):
+        self.__engine.configure(
+            work=self.__saved_settings.get('work'),
+            short_break=self.__saved_settings.get('short_break'),
+            long_break=self.__saved_settings.get('long_break'),
+            cycle=self.__saved_settings.get('cycle'),
+            )
 
-    def __set_cycle_length(self):
-        self.__cycle_length = self.__saved_settings.get('cycle')
+    def __arm_timer(self):
+        # All upcoming events share a single timer armed for the earliest one.
+        event = self.__scheduler.next_event()
+        if event is None:
+            self.__timer.stop()
+            return
+        when, precise = event
+        timeout = max(0, when - self.__scheduler.now())
+        if precise:
+            self.__timer.setTimerType(Qt.PreciseTimer)
+        else:
+            self.__timer.setTimerType(Qt.CoarseTimer)
+        # The scheduler works in seconds but QTimer accepts milliseconds.
+        self.__timer.start(int(math.ceil(timeout * 1000)))
+
+    def __on_timeout(self):
+        self.__check_sleep()
+        self.__scheduler.run_due()
+        self.__arm_timer()
+
+    def __watch_sleep(self):
+        # Timers do not advance while suspended, so without this a suspend is
+        # only noticed on the next timeout. QtDBus is optional as not every
+        # PyQt5 package includes it.
+        try:
+            from PyQt5.QtDBus import QDBusConnection
+        except ImportError:
+            logging.warning('Cannot watch for sleep without QtDBus.')
+            return
+        bus = QDBusConnection.systemBus()
+        if not bus.isConnected():
+            return
+        bus.connect(
+            'org.freedesktop.login1',
+            '/org/freedesktop/login1',
+            'org.freedesktop.login1.Manager',
+            'PrepareForSleep',
+            self.__on_prepare_for_sleep,
+            )
 
-    def __start_work(self):
-        self.__current_timer = self.__work_timer
-        self.__set_period('work')
+    @pyqtSlot(bool)
+    def __on_prepare_for_sleep(self, sleeping):
+        if not sleeping:
+            self.__check_sleep()
+            self.__arm_timer()
 
-    def __start_break(self):
-        self.__current_timer = self.__break_timer
-        if self.__period_counter < self.__cycle_length:
-            self.__period_counter += 1
-            self.__set_period('short break')
-        else:
-            self.__period_counter = 0
-            self.__set_period('long break')
-
-    def __start_timer(self, period):
-        message = '{} started'.format(period.capitalize())
-        self.__current_timer.setInterval(self.__timer_length)
-        self.__current_timer.start()
-        self.timer_updated.emit(message)
-
-    def __pause_timer(self):
-        message = '{} paused'.format(self.__period.capitalize())
-        self.__remaining = self.__current_timer.remainingTime()
-        self.__progress_remaining = self.__progress_timer.remainingTime()
-        self.__current_timer.stop()
-        self.__progress_timer.stop()
-        self.timer_updated.emit(message)
-
-    def __resume_timer(self):
-        message = '{} resumed'.format(self.__period.capitalize())
-        self.__current_timer.setInterval(self.__remaining)
-        self.__current_timer.start()
-        self.__progress_timer.setInterval(self.__progress_remaining)
-        self.__progress_timer.start()
-        self.timer_updated.emit(message)
+    def __check_sleep(self):
+        slept = self.__sleep_detector.check()
+        if slept:
+            policy = self.__saved_settings.get('sleep_policy')
+            self.__engine.suspended(slept, policy)
+
+    def __on_period_ended(self, period, outcome):
+        if outcome != 'reset':
+            self.__play_sound()
 
     def __play_sound(self):
+        if not self.__sound_file_path:
+            return
+        if self.__player is None:
+            from PyQt5.QtMultimedia import QMediaPlayer
+
+            self.__player = QMediaPlayer(self)
+            self.__set_media()
         self.__player.play()
 
-    def __start_progress_timer(self, *args):
-        self.__progress = (self.__progress + 1) % self.__period_steps
-        self.period_progressed.emit(self.__progress)
-        progress_length = int(self.__timer_length / self.__period_steps)
-        self.__progress_timer.setInterval(progress_length)
-        self.__progress_timer.start()
+    def show_settings(self):
+        self.__settings_window_timer.stop()
+        if self.__settings_window is None:
+            from kamatis.settings_window import SettingsWindow
+            window = SettingsWindow()
+            window.settings_set.connect(self.__on_settings_set)
+            self.__settings_window = window
+        self.__settings_window.show()
 
     def save_settings(self):
         new_settings = self.settings.as_dict()
@@ -291,51 +486,107 @@ class Kamatis(QApplication):
             self.__saved_settings.set(key, self.settings.get(key))
 
     def start(self):
-        self.__set_state('RUNNING')
-        self.__start_work()
+        self.__engine.start()
+        self.__arm_timer()
 
     def pause(self):
-        self.__set_state('PAUSED')
-        self.__pause_timer()
+        self.__engine.pause()
+        self.__arm_timer()
 
     def resume(self):
-        self.__set_state('RUNNING')
-        self.__resume_timer()
+        self.__engine.resume()
+        self.__arm_timer()
 
     def reset(self):
         message = 'Current session stopped. Will reset on restart.'
-        self.__current_timer.stop()
-        self.__progress_timer.stop()
         self.__init_state()
         self.__tray_icon.showMessage(self.__application_name, message)
 
     def skip(self):
         message = 'Skipping to the next period.'
-        self.__current_timer.setInterval(0)
-        self.__progress_timer.setInterval(0)
-        self.__current_timer.start()
-        self.__progress_timer.start()
-        if self.__state == 'PAUSED':
-            self.__set_state('RUNNING')
-        self.__progress = -1
+        self.__engine.skip()
+        self.__arm_timer()
         self.__tray_icon.showMessage(self.__application_name, message)
 
+    def reload_settings(self):
+        self.__saved_settings.sync()
+        self.settings.set_defaults(self.__saved_settings.as_dict())
+        self.__apply_settings()
+
+    def get_stats(self):
+        return {
+            'today': self.stats.day(),
+            'week': self.stats.week(),
+            'month': self.stats.month(),
+            'streak': self.stats.streak(),
+            }
+
+    def set_task(self, task):
+        """Tag the work periods from now on with `task`, None for no tag."""
+        self.task = task
+        if self.__history_recorder is not None:
+            self.__history_recorder.task = task
+        if task is not None:
+            self.get_task_index().add(task)
+
+    def get_task_index(self):
+        if self.__task_index is None:
+            names = self.history.tasks() if self.history is not None else ()
+            self.__task_index = TaskIndex(names)
+        return self.__task_index
+
     def get_remaining_time(self):
-        if self.__state == 'PAUSED':
-            return self.__remaining
-        return self.__current_timer.remainingTime()
+        # Only reads, as it is called from the handlers of transitions. Due
+        # events and sleep are left to the timeout and wake handlers.
+        remaining = self.__engine.get_remaining_time()
+        if remaining is None:
+            return 0
+        return int(remaining * 1000)
 
 
-def __sigint_handler(*args):
+def __quit_handler(*args):
     QApplication.quit()
 
 
-def main():
-    signal.signal(signal.SIGINT, __sigint_handler)
-    app = Kamatis(sys.argv)
-    timer = QTimer(app)
-    timer.start(500)
-    timer.timeout.connect(lambda: None)
+def __reload_handler(*args):
+    QApplication.instance().reload_settings()
+
+
+def __drain_socket(sock):
+    try:
+        while sock.recv(4096):
+            pass
+    except (OSError, socket.error):
+        pass
+
+
+def __setup_signal_wakeup(app):
+    # Python signal handlers only run when the interpreter gets control, which
+    # does not happen while Qt's event loop is idle. Let the C-level handler
+    # write to a socket watched by the event loop instead of polling.
+    read_sock, write_sock = socket.socketpair()
+    read_sock.setblocking(False)
+    write_sock.setblocking(False)
+    signal.set_wakeup_fd(write_sock.fileno())
+
+    notifier = QSocketNotifier(read_sock.fileno(), QSocketNotifier.Read, app)
+    notifier.activated.connect(lambda fd: __drain_socket(read_sock))
+
+    # The sockets are closed when garbage collected, so keep them around.
+    return notifier, read_sock, write_sock
+
+
+def main(argv=None, profile=NULL_PROFILE, on_started=None):
+    """Run the app, calling `on_started` once the event loop is running."""
+    if argv is None:
+        argv = sys.argv
+    signal.signal(signal.SIGINT, __quit_handler)
+    signal.signal(signal.SIGTERM, __quit_handler)
+    signal.signal(signal.SIGHUP, __reload_handler)
+    app = Kamatis(argv, profile=profile)
+    wakeup = __setup_signal_wakeup(app)  # noqa
+    if on_started is not None:
+        QTimer.singleShot(0, on_started)
     sys.exit(app.exec_())
 
 
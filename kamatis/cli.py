@@ -0,0 +1,226 @@
+import argparse
+import logging
+import os
+import sys
+
+from kamatis import util
+
+
+def __get_default_database():
+    return os.path.join(util.get_data_dir(), 'kamatis.sqlite')
+
+
+def __open_history(path):
+    from kamatis.history import HistoryStore
+
+    if not os.path.exists(path):
+        raise SystemExit('History not found: {}'.format(path))
+    store = HistoryStore(path)
+    store.open()
+    return store
+
+
+def __export(args):
+    from kamatis.export import (
+        export,
+        open_output,
+        parse_time,
+        )
+
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until) if args.until else None
+    store = __open_history(args.database)
+    stream = open_output(args.output, args.gzip)
+    try:
+        export(store, stream, args.format, since, until)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        store.close()
+
+
+def __import(args):
+    from kamatis.history import HistoryStore
+    from kamatis.importer import (
+        import_history,
+        open_input,
+        )
+
+    util.makedirs(os.path.dirname(os.path.abspath(args.database)))
+    store = HistoryStore(args.database)
+    store.open()
+    streams = [open_input(path) for path in args.files]
+    try:
+        read, imported, rejected = import_history(store, streams, args.format)
+    finally:
+        for stream in streams:
+            if stream is not sys.stdin:
+                stream.close()
+        store.close()
+    skipped = read - imported - rejected
+    print('Imported {} of {} periods ({} overlapping, {} unreadable).'.format(
+        imported, read, skipped, rejected))
+
+
+def __get_default_columns(database):
+    return os.path.splitext(os.path.abspath(database))[0] + '.columns'
+
+
+# Shades of the heatmap, from no time at all to the most.
+SHADES = ' .:-=+*#%@'
+
+
+def __format_heatmap(heatmap, weekdays):
+    most = heatmap.max()
+    hours = ''.join('{:<3}'.format(hour) for hour in range(24))
+    lines = ['    ' + hours.rstrip()]
+    for weekday, row in zip(weekdays, heatmap):
+        shades = []
+        for seconds in row:
+            shade = 0
+            if seconds:
+                shade = max(1, int(seconds * (len(SHADES) - 1) // most))
+            shades.append(SHADES[shade] * 2)
+        lines.append('{} {}'.format(weekday, ' '.join(shades)).rstrip())
+    return '\n'.join(lines)
+
+
+def __stats(args):
+    try:
+        from kamatis import analytics
+    except ImportError:
+        raise SystemExit('The stats command needs NumPy.')
+
+    if not os.path.exists(args.database):
+        raise SystemExit('History not found: {}'.format(args.database))
+    history = analytics.ColumnarHistory(
+        args.columns or __get_default_columns(args.database))
+    history.update(args.database)
+    columns = history.load()
+
+    count = analytics.count(columns, args.period)
+    print('{} periods: {}'.format(args.period.capitalize(), count))
+    if not count:
+        return
+    rates = analytics.outcome_rates(columns, args.period)
+    for outcome in analytics.OUTCOMES:
+        print('{}: {:.0%}'.format(outcome.capitalize(), rates[outcome]))
+    print('Interrupted: {:.0%}'.format(
+        analytics.interruption_rate(columns, args.period)))
+    heatmap = analytics.heatmap(columns, args.period)
+    print('')
+    print('Time by weekday and hour started, at most {:.1f} h:'.format(
+        heatmap.max() / 3600))
+    print(__format_heatmap(heatmap, analytics.WEEKDAYS))
+
+
+def __get_parser():
+    parser = argparse.ArgumentParser(prog='kamatis')
+    parser.add_argument(
+        '--database',
+        default=__get_default_database(),
+        help='history database to use (default: %(default)s)',
+        )
+    subparsers = parser.add_subparsers(dest='command')
+
+    export = subparsers.add_parser('export', help='export the history')
+    export.add_argument('--format', choices=('csv', 'jsonl', 'ics'),
+                        default='csv')
+    export.add_argument('--since', help='local date, e.g. 2017-01-31')
+    export.add_argument('--until', help='local date, exclusive')
+    export.add_argument('--output', default='-',
+                        help='file to write to (default: stdout)')
+    export.add_argument('--gzip', action='store_true',
+                        help='compress the output, implied by a .gz output')
+    export.set_defaults(handler=__export)
+
+    import_ = subparsers.add_parser(
+        'import', help='import the history of another tool')
+    import_.add_argument('files', nargs='+', metavar='FILE',
+                         help='CSV, JSON or JSON Lines file, - for stdin')
+    import_.add_argument('--format', choices=('csv', 'json'),
+                         help='format of the files (default: guessed)')
+    import_.set_defaults(handler=__import)
+
+    stats = subparsers.add_parser(
+        'stats', help='report on the history, needs NumPy')
+    stats.add_argument('--period', choices=('work', 'short break',
+                                            'long break'),
+                       default='work')
+    stats.add_argument('--columns', metavar='DIR',
+                       help='where to keep the snapshot the report is made '
+                            'from (default: next to the database)')
+    stats.set_defaults(handler=__stats)
+
+    return parser
+
+
+COMMANDS = (
+    'export',
+    'import',
+    'stats',
+    )
+
+PROFILE_OPTION = '--profile-startup'
+
+
+def __pop_profile_option(args):
+    """Remove the profiling option from `args` and return its output.
+
+    Returns None without the option, and '-' for stdout when no file is
+    given, as in --profile-startup=startup.json.
+    """
+    for index, arg in enumerate(args):
+        if arg == PROFILE_OPTION:
+            del args[index]
+            return '-'
+        if arg.startswith(PROFILE_OPTION + '='):
+            del args[index]
+            return arg.split('=', 1)[1] or '-'
+    return None
+
+
+def __run_gui(argv, profile_output):
+    if profile_output is None:
+        # Only load Qt when actually starting the GUI.
+        from kamatis import app
+        app.main(argv)
+        return
+
+    from kamatis.profiling import StartupProfile
+
+    profile = StartupProfile()
+    with profile.phase('imports'):
+        from kamatis import app
+
+    def write_profile():
+        if profile_output == '-':
+            profile.write(sys.stdout)
+            return
+        with open(profile_output, 'w') as f:
+            profile.write(f)
+
+    app.main(argv, profile, write_profile)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    # Anything else is left for the GUI, which passes it on to Qt.
+    args = argv[1:]
+    if not any(arg in COMMANDS for arg in args[:3]):
+        profile_output = __pop_profile_option(args)
+        __run_gui(argv[:1] + args, profile_output)
+        return
+
+    logging.basicConfig(level=logging.WARNING)
+    parsed = __get_parser().parse_args(args)
+    try:
+        parsed.handler(parsed)
+    except ValueError as err:
+        raise SystemExit(str(err))
+
+
+if __name__ == '__main__':
+    main()
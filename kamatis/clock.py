@@ -0,0 +1,60 @@
+import time
+
+
+def __get_clock(name, fallback):
+    clock_id = getattr(time, name, None)
+    if clock_id is None or not hasattr(time, 'clock_gettime'):
+        return fallback
+    try:
+        time.clock_gettime(clock_id)
+    except (OSError, ValueError):
+        return fallback
+    return lambda: time.clock_gettime(clock_id)
+
+
+# Stops while the system is suspended.
+monotonic = __get_clock(
+    'CLOCK_MONOTONIC',
+    getattr(time, 'monotonic', time.time),
+    )
+
+# Keeps counting while the system is suspended. Where it is not available,
+# suspends simply go unnoticed.
+boottime = __get_clock('CLOCK_BOOTTIME', monotonic)
+
+
+class SleepDetector(object):
+    """Detects system suspends by comparing the monotonic and boot clocks."""
+
+    # Ignore differences below this many seconds.
+    THRESHOLD = 1.0
+
+    def __init__(self, monotonic=monotonic, boottime=boottime):
+        self.__monotonic = monotonic
+        self.__boottime = boottime
+        self.__offset = self.__get_offset()
+
+    def __get_offset(self):
+        return self.__boottime() - self.__monotonic()
+
+    def check(self):
+        """Return the seconds slept since the last detected suspend."""
+        offset = self.__get_offset()
+        slept = offset - self.__offset
+        if slept < self.THRESHOLD:
+            return 0
+        self.__offset = offset
+        return slept
+
+
+class VirtualClock(object):
+    """Clock that only moves when told to, for simulations and tests."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, secs):
+        self.now += secs
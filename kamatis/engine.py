@@ -0,0 +1,366 @@
+from kamatis.scheduler import Scheduler
+
+
+class Signal(object):
+    """Minimal, Qt-free stand-in for pyqtSignal."""
+
+    __slots__ = (
+        '__receivers',
+        '__on_connect',
+        )
+
+    def __init__(self, on_connect=None):
+        # Most signals are never connected, only allocate a list when needed.
+        self.__receivers = ()
+        self.__on_connect = on_connect
+
+    def __len__(self):
+        return len(self.__receivers)
+
+    def connect(self, slot):
+        self.__receivers = list(self.__receivers)
+        self.__receivers.append(slot)
+        if self.__on_connect is not None:
+            self.__on_connect()
+
+    def disconnect(self, slot):
+        self.__receivers.remove(slot)
+
+    def emit(self, *args):
+        for slot in self.__receivers:
+            slot(*args)
+
+
+class TimerEngine(object):
+    """Pomodoro state machine that does not depend on Qt.
+
+    The engine never sleeps or arms timers by itself. It keeps absolute
+    deadlines on its own timeline of `scheduler` and the owner is expected to
+    call `scheduler.run_due()`, or `update()` which does the same, once
+    `next_timeout()` seconds have passed.
+    """
+
+    PERIODS = (
+        'work',
+        'short break',
+        'long break',
+        )
+
+    SLEEP_POLICIES = (
+        'pause',
+        'break',
+        )
+
+    # Keeps engines small when a process holds thousands of them.
+    __slots__ = (
+        'state_changed',
+        'period_changed',
+        'period_ended',
+        'timer_updated',
+        'period_progressed',
+        'transitioned',
+        '__scheduler',
+        '__timeline',
+        '__period_steps',
+        '__lengths',
+        '__cycle_length',
+        '__state',
+        '__period',
+        '__period_counter',
+        '__progress',
+        '__deadline',
+        '__step_event',
+        '__timer_length',
+        )
+
+    def __init__(self, clock=None, period_steps=12, scheduler=None):
+        self.state_changed = Signal()
+        self.period_changed = Signal()
+        self.period_ended = Signal()
+        self.timer_updated = Signal()
+        # Progress steps are only scheduled while someone is listening.
+        self.period_progressed = Signal(self.__on_progress_connected)
+        # Emitted once the engine is consistent again after any transition.
+        self.transitioned = Signal()
+
+        if scheduler is None:
+            scheduler = Scheduler(clock)
+        self.__scheduler = scheduler
+        self.__timeline = scheduler.timeline()
+        self.__period_steps = period_steps
+        # Lengths are in seconds.
+        self.__lengths = {
+            'work': 25 * 60,
+            'short break': 5 * 60,
+            'long break': 15 * 60,
+            }
+        self.__cycle_length = 4
+
+        self.__state = 'STOPPED'
+        self.__period = None
+        self.__period_counter = 0
+        self.__progress = -1
+        self.__deadline = None
+        self.__step_event = None
+        self.__timer_length = None
+
+    @property
+    def state(self):
+        return self.__state
+
+    @property
+    def period(self):
+        return self.__period
+
+    @property
+    def period_counter(self):
+        return self.__period_counter
+
+    @property
+    def progress(self):
+        if self.__state != 'STOPPED' and not self.period_progressed:
+            return self.__get_progress(self.__timeline.now())
+        return self.__progress
+
+    def configure(self, work=None, short_break=None, long_break=None,
+                  cycle=None):
+        # Lengths are given in minutes, just like in the saved settings. New
+        # lengths take effect on the next period.
+        for period, length in zip(self.PERIODS,
+                                  (work, short_break, long_break)):
+            if length is not None:
+                self.__lengths[period] = length * 60
+        if cycle is not None:
+            self.__cycle_length = cycle
+
+    def __set_state(self, new_state):
+        self.__state = new_state
+        self.state_changed.emit(new_state)
+
+    def __set_period(self, new_period, start_time, length=None,
+                     template='{} started'):
+        self.__begin_period(new_period, start_time, length)
+        self.__announce_period(new_period, start_time, template)
+
+    def __begin_period(self, new_period, start_time, length=None):
+        # Separate from __announce_period() so that the deadline is already
+        # set when the state changes on start and restore.
+        self.__period = new_period
+        if length is None:
+            length = self.__lengths[new_period]
+        self.__timer_length = length
+        self.__deadline = start_time + self.__timer_length
+        self.__timeline.clear()
+        self.__timeline.call_at(self.__deadline, self.__on_deadline,
+                                precise=True)
+        self.__step_event = None
+        self.__progress = -1
+
+    def __announce_period(self, new_period, start_time, template):
+        self.period_changed.emit(new_period)
+        message = template.format(new_period.capitalize())
+        self.timer_updated.emit(message)
+        self.__update_progress(start_time)
+
+    def __move_deadline(self, deadline):
+        self.__deadline = deadline
+        self.__timeline.clear()
+        self.__timeline.call_at(deadline, self.__on_deadline, precise=True)
+        self.__step_event = None
+        self.__update_progress(self.__timeline.now())
+
+    def __start_work(self, start_time):
+        self.__set_period('work', start_time)
+
+    def __start_break(self, start_time):
+        if self.__period_counter < self.__cycle_length:
+            self.__period_counter += 1
+            self.__set_period('short break', start_time)
+        else:
+            self.__period_counter = 0
+            self.__set_period('long break', start_time)
+
+    def __end_period(self, outcome, end_time):
+        period = self.__period
+        self.period_ended.emit(period, outcome)
+        if period == 'work':
+            self.__start_break(end_time)
+        else:
+            self.__start_work(end_time)
+
+    def __step_time(self, step):
+        # Step boundaries are derived from the deadline instead of being
+        # chained one after the other so rounding errors do not accumulate.
+        period_start = self.__deadline - self.__timer_length
+        return period_start + float(self.__timer_length) * step / \
+            self.__period_steps
+
+    def __get_progress(self, now):
+        elapsed = self.__timer_length - (self.__deadline - now)
+        progress = int(elapsed * self.__period_steps / self.__timer_length)
+        progress = max(0, min(progress, self.__period_steps - 1))
+        # Agree with __step_time() even when the division rounded down.
+        if progress + 1 < self.__period_steps and \
+                now >= self.__step_time(progress + 1):
+            progress += 1
+        return progress
+
+    def __update_progress(self, now):
+        progress = self.__get_progress(now)
+        if progress != self.__progress:
+            self.__progress = progress
+            self.period_progressed.emit(progress)
+        self.__schedule_step()
+
+    def __schedule_step(self):
+        if self.__step_event is not None:
+            self.__timeline.cancel(self.__step_event)
+            self.__step_event = None
+        step = self.__progress + 1
+        if step < self.__period_steps and self.period_progressed:
+            # Progress steps do not need to be precise, unlike the period end.
+            self.__step_event = self.__timeline.call_at(
+                self.__step_time(step),
+                self.__on_step,
+                )
+
+    def __on_progress_connected(self):
+        if self.__state != 'STOPPED' and self.__step_event is None:
+            self.__update_progress(self.__timeline.now())
+
+    def __on_step(self):
+        self.__step_event = None
+        self.__update_progress(self.__timeline.now())
+
+    def __on_deadline(self):
+        # The next period starts exactly at the old deadline, not at the time
+        # we got around to noticing it.
+        self.__end_period('finished', self.__deadline)
+        self.transitioned.emit()
+
+    def start(self):
+        if self.__state != 'STOPPED':
+            return
+        now = self.__timeline.now()
+        self.__begin_period('work', now)
+        self.__set_state('RUNNING')
+        self.__announce_period('work', now, '{} started')
+        self.transitioned.emit()
+
+    def pause(self):
+        if self.__state != 'RUNNING':
+            return
+        self.__timeline.pause()
+        self.__set_state('PAUSED')
+        message = '{} paused'.format(self.__period.capitalize())
+        self.timer_updated.emit(message)
+        self.transitioned.emit()
+
+    def resume(self):
+        if self.__state != 'PAUSED':
+            return
+        self.__timeline.resume()
+        self.__set_state('RUNNING')
+        message = '{} resumed'.format(self.__period.capitalize())
+        self.timer_updated.emit(message)
+        self.transitioned.emit()
+
+    def reset(self):
+        if self.__state != 'STOPPED':
+            self.period_ended.emit(self.__period, 'reset')
+        self.__timeline.clear()
+        self.__timeline.resume()
+        self.__period = None
+        self.__period_counter = 0
+        self.__progress = -1
+        self.__deadline = None
+        self.__step_event = None
+        self.__set_state('STOPPED')
+        self.transitioned.emit()
+
+    def skip(self):
+        if self.__state == 'STOPPED':
+            return
+        if self.__state == 'PAUSED':
+            self.__timeline.resume()
+            self.__set_state('RUNNING')
+        self.__end_period('skipped', self.__timeline.now())
+        self.transitioned.emit()
+
+    def suspended(self, duration, policy='pause'):
+        """Account for `duration` seconds the system spent suspended.
+
+        The scheduler clock does not advance during a suspend, so the time is
+        lost unless the policy is 'break', in which case it counts as a break.
+        With the 'pause' policy the timer is paused instead.
+        """
+        if self.__state != 'RUNNING' or duration <= 0:
+            return
+        if policy == 'pause':
+            self.pause()
+            return
+
+        now = self.__timeline.now()
+        if self.__period == 'work':
+            # The break started when the system went to sleep.
+            self.__end_period('skipped', now - duration)
+            deadline = self.__deadline
+        else:
+            deadline = self.__deadline - duration
+
+        if deadline <= now:
+            # Slept through the whole break. Work starts now, not back when
+            # the break would have ended.
+            self.__timeline.clear()
+            self.__end_period('finished', now)
+        elif deadline != self.__deadline:
+            self.__move_deadline(deadline)
+        self.transitioned.emit()
+
+    def snapshot(self):
+        """Return `(state, period, period_counter, remaining, length)`."""
+        return (
+            self.__state,
+            self.__period,
+            self.__period_counter,
+            self.get_remaining_time(),
+            self.__timer_length if self.__state != 'STOPPED' else None,
+            )
+
+    def restore(self, state, period, period_counter, remaining, length):
+        """Continue a session saved with `snapshot()`."""
+        self.__timeline.clear()
+        self.__timeline.resume()
+        self.__step_event = None
+        self.__progress = -1
+        self.__period_counter = period_counter
+        if state == 'STOPPED':
+            self.__period = None
+            self.__deadline = None
+            self.__set_state('STOPPED')
+            self.transitioned.emit()
+            return
+
+        remaining = max(0, min(remaining, length))
+        start_time = self.__timeline.now() + remaining - length
+        self.__begin_period(period, start_time, length)
+        self.__set_state('RUNNING')
+        self.__announce_period(period, start_time, '{} resumed')
+        if state == 'PAUSED':
+            self.__timeline.pause()
+            self.__set_state('PAUSED')
+        self.transitioned.emit()
+
+    def update(self):
+        """Process every transition that is due by now."""
+        self.__scheduler.run_due()
+
+    def get_remaining_time(self):
+        """Return the remaining time of the current period in seconds."""
+        if self.__state == 'STOPPED' or self.__deadline is None:
+            return None
+        return max(0, self.__deadline - self.__timeline.now())
+
+    def next_timeout(self):
+        """Return the seconds until `update()` has work to do, or None."""
+        return self.__scheduler.next_timeout()
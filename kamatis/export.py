@@ -0,0 +1,154 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import sys
+import time
+
+FIELDS = (
+    'start',
+    'end',
+    'period',
+    'outcome',
+    'planned',
+    'actual',
+    'pauses',
+    'task',
+    )
+
+
+def parse_time(text):
+    """Return the timestamp of a local YYYY-MM-DD[THH:MM[:SS]] date."""
+    for template in ('%Y-%m-%d', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S',
+                     '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S'):
+        try:
+            parsed = time.strptime(text, template)
+        except ValueError:
+            continue
+        return time.mktime(parsed)
+    raise ValueError('Invalid date: {}'.format(text))
+
+
+def __format_iso(timestamp):
+    """Return the local time of `timestamp` with its UTC offset."""
+    local = datetime.datetime.fromtimestamp(timestamp)
+    utc = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=timestamp)
+    offset = int(round((local - utc).total_seconds() / 60))
+    return '{}{}{:02d}:{:02d}'.format(local.isoformat(),
+                                       '-' if offset < 0 else '+',
+                                       abs(offset) // 60, abs(offset) % 60)
+
+
+def write_csv(records, stream):
+    writer = csv.writer(stream)
+    writer.writerow(FIELDS)
+    count = 0
+    for record in records:
+        writer.writerow((
+            __format_iso(record.start),
+            __format_iso(record.end),
+            record.period,
+            record.outcome,
+            int(record.planned),
+            int(record.actual),
+            record.pauses,
+            record.task or '',
+            ))
+        count += 1
+    return count
+
+
+def write_jsonl(records, stream):
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record._asdict(), separators=(',', ':')))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def __format_ics_time(timestamp):
+    return time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(timestamp))
+
+
+def __get_ics_summary(record):
+    summary = '{} ({})'.format(record.period.capitalize(), record.outcome)
+    if record.task:
+        # Commas and semicolons are separators in iCalendar text.
+        task = record.task.replace('\\', '\\\\').replace(',', '\\,')
+        summary = '{}: {}'.format(summary, task.replace(';', '\\;'))
+    return summary
+
+
+def __fold_ics_line(line):
+    """Return `line` folded into lines of at most 75 octets, with CRLF."""
+    # Continuation lines start with a space. UTF-8 sequences are not split.
+    parts = []
+    octets = 0
+    start = 0
+    for i, char in enumerate(line):
+        size = len(char.encode('utf-8'))
+        limit = 75 if not parts else 74
+        if octets + size > limit:
+            parts.append(line[start:i])
+            start = i
+            octets = 0
+        octets += size
+    parts.append(line[start:])
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def write_ics(records, stream):
+    # Lines of iCalendar files must end with CRLF and be folded.
+    stream.write('BEGIN:VCALENDAR\r\n'
+                 'VERSION:2.0\r\n'
+                 'PRODID:-//Fumisoft//Kamatis//EN\r\n')
+    now = __format_ics_time(time.time())
+    count = 0
+    for record in records:
+        stream.write(
+            'BEGIN:VEVENT\r\n'
+            'UID:{uid}@kamatis\r\n'
+            'DTSTAMP:{now}\r\n'
+            'DTSTART:{start}\r\n'
+            'DTEND:{end}\r\n'
+            '{summary}'
+            'END:VEVENT\r\n'.format(
+                uid='{:.3f}-{}'.format(record.start,
+                                       record.period.replace(' ', '-')),
+                now=now,
+                start=__format_ics_time(record.start),
+                end=__format_ics_time(record.end),
+                summary=__fold_ics_line(
+                    'SUMMARY:{}'.format(__get_ics_summary(record))),
+                ))
+        count += 1
+    stream.write('END:VCALENDAR\r\n')
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'ics': write_ics,
+    }
+
+
+def open_output(path, compress=False):
+    """Open `path` for writing text, '-' being stdout."""
+    if path == '-':
+        if not compress:
+            return sys.stdout
+        raw = getattr(sys.stdout, 'buffer', sys.stdout)
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode='wb'),
+                                newline='')
+    if compress or path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'wb'), newline='')
+    return io.open(path, 'w', newline='')
+
+
+def export(store, stream, fmt, since=None, until=None):
+    """Stream the history in `fmt` to `stream`, returning the row count."""
+    records = store.iter_query(since, until)
+    return WRITERS[fmt](records, stream)
@@ -2,9 +2,32 @@
 from __future__ import unicode_literals
 import logging
 
-# Import PyQt5 classes
-from .qt import *
-
+# Import Qt classes, looked up in the binding as they are imported
+from .qt import (
+    QAction,
+    QActionGroup,
+    QButtonGroup,
+    QCheckBox,
+    QComboBox,
+    QDoubleSpinBox,
+    QFileSystemWatcher,
+    QLineEdit,
+    QListWidget,
+    QMutex,
+    QMutexLocker,
+    QObject,
+    QPlainTextEdit,
+    QPushButton,
+    QSettings,
+    QSlider,
+    QSpinBox,
+    QTabWidget,
+    QTimer,
+    Qt,
+    pyqtSignal,
+)
+
+import copy
 import os
 import sys
 import types
@@ -19,8 +42,8 @@ except ImportError:
     import xml.etree.ElementTree as et
 
 try:
-    QVariant
-except NameError:
+    from .qt import QVariant
+except ImportError:
     QVariant = None
 
 RECALCULATE_ALL = 1
@@ -157,6 +180,32 @@ try:
 except:
     basestring = str
 
+# Decoding of stored values to the type of their default, see QSettingsManager
+# If QVariant (Qt4):
+QVARIANT_TYPE_MUNGE = {
+    int: lambda v: v.toInt(),
+    float: lambda v: v.toFloat(),
+    str: lambda v: v.toString(),
+    unicode: lambda v: v.toString(),
+    bool: lambda v: v.toBool(),
+    list: lambda v: v.toStringList(),
+}
+
+# Value is stored as unicode
+STRING_TYPE_MUNGE = {
+    int: lambda x: int(x),
+    float: lambda x: float(x),
+    str: lambda x: str(x),
+    bool: lambda x: x.lower() == u'true',
+    # other types?
+}
+
+# Values QSettingsManager caches as written
+SCALAR_TYPES = (bool, int, float, str, unicode)
+
+# Marks keys not in the QSettingsManager cache
+_MISSING = object()
+
 
 def build_tuple_mapper(mlist):
     '''
@@ -694,8 +743,9 @@ class ConfigManagerBase(QObject):
             getter = self.handlers[key].getter
             setter = self.handlers[key].setter
 
-            if setter and getter() != self._get(key):
-                setter(self._get(key))
+            current = self._get(key)
+            if setter and getter() != current:
+                setter(current)
 
         # Trigger update notification
         if trigger_update:
@@ -940,6 +990,37 @@ class ConfigManager(ConfigManagerBase):
 
 
 class QSettingsManager(ConfigManagerBase):
+    """
+        Config manager backed by QSettings, with decoded values cached in memory.
+
+        Values are cached on first read and dropped again by writes through the
+        manager, default changes and sync(). Writes are synced to storage SYNC_DELAY
+        milliseconds after the first unsynced one; call sync() before quitting to
+        flush them. The settings file is watched and changes made outside the
+        manager are picked up by a sync() as they happen.
+    """
+
+    SYNC_DELAY = 1000
+
+    def __init__(self, *args, **kwargs):
+        super(QSettingsManager, self).__init__(*args, **kwargs)
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setTimerType(Qt.CoarseTimer)
+        self._sync_timer.setInterval(self.SYNC_DELAY)
+        self._sync_timer.timeout.connect(self.sync)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._watch()
+
+    def _watch(self):
+        # Saving replaces the file, which drops it from the watcher.
+        path = self.settings.fileName()
+        if path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+
+    def _on_file_changed(self, path):
+        self.sync()
 
     def reset(self):
         """
@@ -948,55 +1029,79 @@ class QSettingsManager(ConfigManagerBase):
             This initialises QSettings, unsets all defaults and removes all handlers, maps, and hooks.
         """
         self.settings = QSettings()
+        self.cache = {}
         self.handlers = {}
         self.handler_callbacks = {}
         self.defaults = {}
         self.maps = {}
         self.eventhooks = {}
 
-    def _get(self, key):
+    def sync(self):
+        """
+            Write pending changes to storage and reload changes made elsewhere.
+        """
+        self._sync_timer.stop()
         with QMutexLocker(self.mutex):
+            self.settings.sync()
+            self.cache.clear()
+        self._watch()
+
+    def set_default(self, key, value, eventhook=RECALCULATE_ALL):
+        # Values are decoded to the type of the default.
+        self.cache.pop(key, None)
+        super(QSettingsManager, self).set_default(key, value, eventhook)
 
-            v = self.settings.value(key, None)
-            if v is not None:
-                if type(v) == QVariant and v.type() == QVariant.Invalid:  # Invalid check for Qt4
-                    return None
-
-                # Map type to that in defaults: required in case QVariant is a string
-                # representation of the actual value (e.g. on Windows Reg)
-                vt = type(v)
-                if key in self.defaults:
-                    dt = type(self.defaults[key])
-                    if vt == QVariant:
-                        # The target type is a QVariant so munge it
-                        # If QVariant (Qt4):
-                        type_munge = {
-                            int: v.toInt,
-                            float: v.toFloat,
-                            str: v.toString,
-                            unicode: v.toString,
-                            bool: v.toBool,
-                            list: v.toStringList,
-                        }
-                        v = type_munge[dt]()
-                    elif vt != dt and issubclass(vt, basestring):
-                        # Value is stored as unicode so munge it
-                        type_munge = {
-                            int: lambda x: int(x),
-                            float: lambda x: float(x),
-                            str: lambda x: str(x),
-                            bool: lambda x: x.lower() == u'true',
-                            # other types?
-                        }
-                        v = type_munge[dt](v)
-
-                    v = dt(v)
-
-                return v
+    def set_defaults(self, keyvalues, eventhook=RECALCULATE_ALL):
+        for key in keyvalues:
+            self.cache.pop(key, None)
+        super(QSettingsManager, self).set_defaults(keyvalues, eventhook)
 
-            else:
+    def _get(self, key):
+        # Reading a dict is atomic, so hits need no locking.
+        v = self.cache.get(key, _MISSING)
+        if v is _MISSING:
+            with QMutexLocker(self.mutex):
+                v = self._decode(key, self.settings.value(key, None))
+                self.cache[key] = v
+        if isinstance(v, (list, dict)):
+            # Callers may change what they get.
+            v = copy.copy(v)
+        return v
+
+    def _decode(self, key, v):
+        if v is not None:
+            if type(v) == QVariant and v.type() == QVariant.Invalid:  # Invalid check for Qt4
                 return None
 
+            # Map type to that in defaults: required in case QVariant is a string
+            # representation of the actual value (e.g. on Windows Reg)
+            vt = type(v)
+            if key in self.defaults:
+                dt = type(self.defaults[key])
+                if vt == QVariant:
+                    # The target type is a QVariant so munge it
+                    # If QVariant (Qt4):
+                    v = QVARIANT_TYPE_MUNGE[dt](v)
+                elif vt != dt and issubclass(vt, basestring):
+                    # Value is stored as unicode so munge it
+                    v = STRING_TYPE_MUNGE[dt](v)
+
+                v = dt(v)
+
+            return v
+
+        else:
+            return None
+
     def _set(self, key, value):
         with QMutexLocker(self.mutex):
             self.settings.setValue(key, value)
+            if type(value) in SCALAR_TYPES and key in self.defaults and \
+                    type(value) == type(self.defaults[key]):
+                # Reading it back would give the same value.
+                self.cache[key] = value
+            else:
+                self.cache.pop(key, None)
+        # Batch the syncs of writes close together.
+        if not self._sync_timer.isActive():
+            self._sync_timer.start()
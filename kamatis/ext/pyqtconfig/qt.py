@@ -1,62 +1,87 @@
 from __future__ import unicode_literals
-import sys
+import importlib
 import os
-import logging
+import sys
+import types
 
-PYSIDE = 0
-PYQT4 = 1
 PYQT5 = 2
+PYSIDE2 = 3
+PYSIDE6 = 4
+
+PACKAGES = {
+    PYQT5: 'PyQt5',
+    PYSIDE2: 'PySide2',
+    PYSIDE6: 'PySide6',
+    }
+
+# Modules looked in for a name, in order. Only these are ever imported, and
+# only once a name is first asked for.
+MODULES = ('QtCore', 'QtGui', 'QtWidgets')
+
+# PyQt names for what PySide calls differently.
+PYSIDE_NAMES = {
+    'pyqtSignal': 'Signal',
+    'pyqtSlot': 'Slot',
+    'pyqtProperty': 'Property',
+    }
 
 USE_QT_PY = None
 
 QT_API_ENV = os.environ.get('QT_API')
-ETS = dict(pyqt=PYQT4, pyqt5=PYQT5, pyside=PYSIDE)
+ETS = dict(pyqt5=PYQT5, pyside2=PYSIDE2, pyside6=PYSIDE6)
 
 # Check environment variable
 if QT_API_ENV and QT_API_ENV in ETS:
     USE_QT_PY = ETS[QT_API_ENV]
 
-# Check if one already importer
-elif 'PyQt4' in sys.modules:
-    USE_QT_PY = PYQT4
-elif 'PyQt5' in sys.modules:
-    USE_QT_PY = PYQT5
+# Check if one already imported
 else:
-    # Try importing in turn
-    try:
-        import PyQt5
-        USE_QT_PY = PYQT5
-    except:
-        try:
-            import PyQt4
-            USE_QT_PY = PYQT4
-        except ImportError:
+    for api in (PYQT5, PYSIDE2, PYSIDE6):
+        if PACKAGES[api] in sys.modules:
+            USE_QT_PY = api
+            break
+    else:
+        # Try importing in turn. Only the package is imported, which does
+        # not load any Qt library.
+        for api in (PYQT5, PYSIDE2, PYSIDE6):
+            try:
+                importlib.import_module(PACKAGES[api])
+            except ImportError:
+                continue
+            USE_QT_PY = api
+            break
+
+
+class _LazyBinding(types.ModuleType):
+    """Module resolving Qt names from the binding on first access.
+
+    Resolved names are stored on the module, so later lookups are plain
+    attribute lookups. Use `from .qt import QObject` rather than a star
+    import, which would find nothing to import.
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('__') or USE_QT_PY is None:
+            raise AttributeError(name)
+        if USE_QT_PY != PYQT5:
+            real_name = PYSIDE_NAMES.get(name, name)
+        else:
+            real_name = name
+        for module_name in MODULES:
+            module = importlib.import_module(
+                '{}.{}'.format(PACKAGES[USE_QT_PY], module_name))
             try:
-                import PySide
-                USE_QT_PY = PYSIDE
-            except:
-                pass
-
-# Import PyQt classes accessible in elsewhere through from qt import *
-if USE_QT_PY == PYQT5:
-    from PyQt5.QtGui import *
-    from PyQt5.QtCore import *
-    from PyQt5.QtNetwork import *
-    from PyQt5.QtWidgets import *
-
-elif USE_QT_PY == PYSIDE:
-    from PySide.QtGui import *
-    from PySide.QtCore import *
-    from PySide.QtNetwork import *
-
-    pyqtSignal = Signal
-
-
-elif USE_QT_PY == PYQT4:
-    import sip
-    sip.setapi('QString', 2)
-    sip.setapi('QVariant', 2)
-    from PyQt4.QtGui import *
-    from PyQt4.QtCore import *
-    from PyQt4.QtWebKit import *
-    from PyQt4.QtNetwork import *
+                value = getattr(module, real_name)
+            except AttributeError:
+                continue
+            setattr(self, name, value)
+            return value
+        raise AttributeError(name)
+
+
+# The original module stays referenced through _module, as Python 2 clears
+# the globals of collected modules.
+_module = sys.modules[__name__]
+_binding = _LazyBinding(__name__, _module.__doc__)
+_binding.__dict__.update(_module.__dict__)
+sys.modules[__name__] = _binding
@@ -0,0 +1,441 @@
+from collections import namedtuple
+import logging
+import sqlite3
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2.
+    import Queue as queue
+
+
+PeriodRecord = namedtuple('PeriodRecord', (
+    'start',
+    'end',
+    'period',
+    'outcome',
+    'planned',
+    'actual',
+    'pauses',
+    'task',
+    ))
+# Only work periods have a task.
+PeriodRecord.__new__.__defaults__ = (None,)
+
+# A single start, pause, resume or end of a period. Ends have the outcome as
+# their kind.
+EventRecord = namedtuple('EventRecord', (
+    'time',
+    'kind',
+    'period',
+    ))
+
+# Request for a pass of HistoryStore.compact() on the writer thread.
+_Compaction = namedtuple('_Compaction', (
+    'event_cutoff',
+    'period_cutoff',
+    'limit',
+    ))
+
+
+def get_day(timestamp):
+    """Return the local date of `timestamp` as YYYY-MM-DD."""
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+def get_next_day(timestamp):
+    """Return the local midnight after `timestamp`."""
+    local = time.localtime(timestamp)
+    return time.mktime(local[:2] + (local[2] + 1, 0, 0, 0, 0, 0, -1))
+
+
+class HistoryStore(object):
+    """SQLite store of finished, skipped and reset periods.
+
+    Times are Unix timestamps and durations are in seconds. Writes are queued
+    and done in batches by a background thread, so callers never wait on the
+    disk. Queries are done on a separate connection of the calling thread.
+
+    History is kept at three levels of detail: raw events, one summary per
+    period and per-day totals. `compact()` drops the older levels of detail.
+    """
+
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS periods (
+            id INTEGER PRIMARY KEY,
+            start REAL NOT NULL,
+            end REAL NOT NULL,
+            period TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            planned REAL NOT NULL,
+            actual REAL NOT NULL,
+            pauses INTEGER NOT NULL DEFAULT 0,
+            task TEXT
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS periods_start ON periods (start)',
+        '''
+        CREATE INDEX IF NOT EXISTS periods_period_start
+            ON periods (period, start)
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            time REAL NOT NULL,
+            kind TEXT NOT NULL,
+            period TEXT NOT NULL
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS events_time ON events (time)',
+        # Running per-day totals of work periods, updated in the same
+        # transaction as the periods themselves. These are kept after the
+        # periods are compacted away.
+        '''
+        CREATE TABLE IF NOT EXISTS daily (
+            day TEXT PRIMARY KEY,
+            pomodoros INTEGER NOT NULL DEFAULT 0,
+            focus REAL NOT NULL DEFAULT 0
+            )
+        ''',
+        )
+
+    # Most rows written in a single transaction.
+    BATCH_SIZE = 1000
+
+    # Most events deleted in a single compaction pass.
+    COMPACTION_LIMIT = 500
+
+    def __init__(self, path):
+        self.__path = path
+        self.__queue = queue.Queue()
+        self.__thread = None
+        self.__connection = None
+
+    @property
+    def path(self):
+        return self.__path
+
+    def __connect(self):
+        connection = sqlite3.connect(self.__path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def open(self):
+        # Create the schema right away so queries work before the first write.
+        self.__connection = self.__connect()
+        with self.__connection:
+            for statement in self.SCHEMA:
+                self.__connection.execute(statement)
+            self.__migrate(self.__connection)
+            cursor = self.__connection.execute(
+                'SELECT NOT EXISTS (SELECT 1 FROM daily) '
+                'AND EXISTS (SELECT 1 FROM periods)'
+                )
+            if cursor.fetchone()[0]:
+                self.__rebuild_daily(self.__connection)
+
+        self.__thread = threading.Thread(target=self.__write_loop)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __migrate(self, connection):
+        columns = [row[1] for row in
+                   connection.execute('PRAGMA table_info(periods)')]
+        if 'task' not in columns:
+            connection.execute('ALTER TABLE periods ADD COLUMN task TEXT')
+
+    def close(self):
+        if self.__thread is not None:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    def add(self, record):
+        """Queue a PeriodRecord or an EventRecord for writing."""
+        self.__queue.put(record)
+
+    def compact(self, event_days=None, period_days=None, now=None):
+        """Drop events and periods older than the given number of days.
+
+        Periods are dropped a whole local day at a time, their totals stay
+        in the daily table. None keeps that level forever. The work is done
+        on the writer thread in passes, in between writes, of at most
+        `COMPACTION_LIMIT` events and one day of periods.
+        """
+        if now is None:
+            now = time.time()
+        event_cutoff = None
+        period_cutoff = None
+        if event_days is not None:
+            event_cutoff = now - event_days * 86400
+        if period_days is not None:
+            local = time.localtime(now - period_days * 86400)
+            period_cutoff = time.mktime(local[:3] + (0, 0, 0, 0, 0, -1))
+        self.__queue.put(_Compaction(event_cutoff, period_cutoff,
+                                     self.COMPACTION_LIMIT))
+
+    def flush(self):
+        """Wait until every queued record has been written."""
+        self.__queue.join()
+
+    def insert(self, records):
+        """Write `records` right away in a single transaction.
+
+        Meant for bulk loads. Records queued with `add()` are written first.
+        """
+        self.flush()
+        with self.__connection:
+            self.__write(self.__connection, records)
+
+    def __write_loop(self):
+        connection = self.__connect()
+        running = True
+        while running:
+            batch = [self.__queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            running = None not in batch
+            records = []
+            compactions = []
+            for item in batch:
+                if isinstance(item, _Compaction):
+                    compactions.append(item)
+                elif item is not None:
+                    records.append(item)
+            try:
+                with connection:
+                    self.__write(connection, records)
+                for compaction in compactions[-1:]:
+                    with connection:
+                        done = self.__compact(connection, compaction)
+                    if not done and running:
+                        # Let queued writes go first.
+                        self.__queue.put(compaction)
+            except sqlite3.Error:
+                logging.warning('Cannot write history.', exc_info=True)
+            for _ in batch:
+                self.__queue.task_done()
+        connection.close()
+
+    def __write(self, connection, records):
+        events = [record for record in records
+                  if isinstance(record, EventRecord)]
+        if events:
+            records = [record for record in records
+                       if not isinstance(record, EventRecord)]
+            connection.executemany(
+                'INSERT INTO events (time, kind, period) VALUES (?, ?, ?)',
+                events,
+                )
+        connection.executemany(
+            'INSERT INTO periods '
+            '(start, end, period, outcome, planned, actual, pauses, task) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            records,
+            )
+
+        daily = {}
+        for record in records:
+            if record.period != 'work':
+                continue
+            day = get_day(record.start)
+            pomodoros, focus = daily.get(day, (0, 0))
+            daily[day] = (
+                pomodoros + (record.outcome == 'finished'),
+                focus + record.actual,
+                )
+        connection.executemany(
+            'INSERT OR IGNORE INTO daily (day) VALUES (?)',
+            [(day,) for day in daily],
+            )
+        connection.executemany(
+            'UPDATE daily SET pomodoros = pomodoros + ?, focus = focus + ? '
+            'WHERE day = ?',
+            [(pomodoros, focus, day)
+             for day, (pomodoros, focus) in daily.items()],
+            )
+
+    def __compact(self, connection, compaction):
+        """Do one pass of a compaction, returning whether it is done."""
+        done = True
+        if compaction.event_cutoff is not None:
+            cursor = connection.execute(
+                'DELETE FROM events WHERE id IN (SELECT id FROM events '
+                'WHERE time < ? ORDER BY time LIMIT ?)',
+                (compaction.event_cutoff, compaction.limit),
+                )
+            if cursor.rowcount >= compaction.limit:
+                done = False
+        if compaction.period_cutoff is not None:
+            # Periods go a whole local day per pass, so the days left can
+            # always be rebuilt from their periods.
+            oldest = connection.execute(
+                'SELECT MIN(start) FROM periods WHERE start < ?',
+                (compaction.period_cutoff,),
+                ).fetchone()[0]
+            if oldest is not None:
+                end = min(get_next_day(oldest), compaction.period_cutoff)
+                connection.execute('DELETE FROM periods WHERE start < ?',
+                                   (end,))
+                if end < compaction.period_cutoff:
+                    done = False
+        return done
+
+    def __rebuild_daily(self, connection):
+        # Days older than the oldest period were compacted and can only be
+        # kept as they are.
+        first = connection.execute('SELECT MIN(start) FROM periods')
+        first = first.fetchone()[0]
+        if first is None:
+            return
+        first_day = get_day(first)
+        connection.execute('DELETE FROM daily WHERE day >= ?', (first_day,))
+        connection.execute(
+            "INSERT INTO daily (day, pomodoros, focus) "
+            "SELECT date(start, 'unixepoch', 'localtime'), "
+            "SUM(outcome = 'finished'), SUM(actual) "
+            "FROM periods WHERE period = 'work' "
+            "GROUP BY date(start, 'unixepoch', 'localtime')"
+            )
+
+    def rebuild_daily(self):
+        """Recompute the per-day totals from the raw periods."""
+        self.flush()
+        with self.__connection:
+            self.__rebuild_daily(self.__connection)
+
+    def daily(self):
+        """Return `(day, pomodoros, focus)` of every day with work."""
+        cursor = self.__connection.execute(
+            'SELECT day, pomodoros, focus FROM daily ORDER BY day')
+        return cursor.fetchall()
+
+    def events(self, since=None):
+        """Return the events since `since`, oldest first."""
+        cursor = self.__connection.execute(
+            'SELECT time, kind, period FROM events WHERE time >= ? '
+            'ORDER BY time',
+            (since if since is not None else float('-inf'),),
+            )
+        return [EventRecord(*row) for row in cursor]
+
+    def tasks(self):
+        """Return the names of every task, most recently used last."""
+        cursor = self.__connection.execute(
+            'SELECT task FROM periods WHERE task IS NOT NULL '
+            'GROUP BY task ORDER BY MAX(start)'
+            )
+        return [row[0] for row in cursor]
+
+    def iter_query(self, since=None, until=None, period=None):
+        """Yield the records that started in [since, until), oldest first.
+
+        Rows are fetched from SQLite as they are consumed.
+        """
+        sql = 'SELECT {} FROM periods'.format(', '.join(PeriodRecord._fields))
+        conditions = []
+        params = []
+        if period is not None:
+            conditions.append('period = ?')
+            params.append(period)
+        if since is not None:
+            conditions.append('start >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('start < ?')
+            params.append(until)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY start'
+        cursor = self.__connection.execute(sql, params)
+        for row in cursor:
+            yield PeriodRecord(*row)
+
+    def query(self, since=None, until=None, period=None):
+        """Return the records that started in [since, until), oldest first."""
+        return list(self.iter_query(since, until, period))
+
+
+class HistoryRecorder(object):
+    """Turns the signals of a TimerEngine into period records.
+
+    Work periods are tagged with `task` as it is when they end. If given,
+    `event_callback` also gets an EventRecord for every start, pause, resume
+    and end.
+    """
+
+    def __init__(self, engine, callback, wall_clock=time.time,
+                 event_callback=None):
+        self.task = None
+        self.__engine = engine
+        self.__callback = callback
+        self.__event_callback = event_callback
+        self.__wall_clock = wall_clock
+        self.__start = None
+        self.__planned = None
+        self.__pauses = 0
+        self.__paused = 0
+        self.__paused_at = None
+
+        engine.period_changed.connect(self.__on_period_changed)
+        engine.state_changed.connect(self.__on_state_changed)
+        engine.period_ended.connect(self.__on_period_ended)
+
+    def __on_period_changed(self, period):
+        _, _, _, remaining, length = self.__engine.snapshot()
+        # The period may have started earlier, e.g. after a late timeout or
+        # when restored from the journal.
+        self.__start = self.__wall_clock() - (length - remaining)
+        self.__planned = length
+        self.__pauses = 0
+        self.__paused = 0
+        self.__paused_at = None
+        self.__add_event(self.__start, 'started', period)
+
+    def __add_event(self, wall_time, kind, period):
+        if self.__event_callback is not None:
+            self.__event_callback(EventRecord(wall_time, kind, period))
+
+    def __on_state_changed(self, state):
+        if state == 'PAUSED':
+            self.__paused_at = self.__wall_clock()
+            self.__pauses += 1
+            self.__add_event(self.__paused_at, 'paused',
+                             self.__engine.period)
+        elif self.__paused_at is not None:
+            now = self.__wall_clock()
+            self.__paused += now - self.__paused_at
+            self.__paused_at = None
+            self.__add_event(now, 'resumed', self.__engine.period)
+
+    def __on_period_ended(self, period, outcome):
+        if self.__start is None:
+            return
+        if self.__paused_at is not None:
+            self.__paused += self.__wall_clock() - self.__paused_at
+            self.__paused_at = None
+        remaining = self.__engine.get_remaining_time()
+        actual = self.__planned - remaining
+        end = self.__start + actual + self.__paused
+        self.__callback(PeriodRecord(
+            self.__start,
+            end,
+            period,
+            outcome,
+            self.__planned,
+            actual,
+            self.__pauses,
+            self.task if period == 'work' else None,
+            ))
+        self.__add_event(end, outcome, period)
+        self.__start = None
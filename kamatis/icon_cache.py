@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import QApplication
+
+from kamatis.icon_renderer import IconRenderer
+
+
+# Sizes tray icons are drawn at by the common desktops, in device
+# independent pixels.
+ICON_SIZES = (16, 22, 24, 32, 48)
+
+
+class IconCache(object):
+    """Bounded cache of tray icon frames rendered at the tray icon sizes.
+
+    Frames are keyed by (variant, frame, size, device pixel ratio), where
+    the frame is the fraction of the period rounded to what is visible at
+    that size. Icons holding a frame of every size are cached too, and the
+    same icon object is returned for fractions that look the same, so
+    callers can skip updates by comparing it with the icon they show.
+    """
+
+    def __init__(self, renderer=None, sizes=ICON_SIZES, max_frames=1024):
+        if renderer is None:
+            renderer = IconRenderer()
+        self.__renderer = renderer
+        self.__sizes = sizes
+        self.__max_frames = max_frames
+        self.__frames = OrderedDict()
+        self.__icons = OrderedDict()
+
+    def __len__(self):
+        return len(self.__frames)
+
+    def clear(self):
+        self.__frames.clear()
+        self.__icons.clear()
+
+    def __get_ratio(self):
+        return QApplication.instance().devicePixelRatio()
+
+    def __get_pixels(self, size, ratio):
+        return int(round(size * ratio))
+
+    def pixmap(self, variant, fraction, size, ratio=None):
+        if ratio is None:
+            ratio = self.__get_ratio()
+        pixels = self.__get_pixels(size, ratio)
+        frame = self.__renderer.get_frame(fraction, pixels)
+        key = (variant, frame, size, ratio)
+        pixmap = self.__frames.pop(key, None)
+        if pixmap is None:
+            pixmap = self.__renderer.render(variant, frame, pixels, ratio)
+        # Insert again to mark it as the most recently used.
+        self.__frames[key] = pixmap
+        while len(self.__frames) > self.__max_frames:
+            self.__frames.popitem(last=False)
+        return pixmap
+
+    def icon(self, variant, fraction, ratio=None):
+        """Return the icon of a fraction with a pixmap for every size."""
+        if ratio is None:
+            ratio = self.__get_ratio()
+        frames = tuple(
+            self.__renderer.get_frame(fraction,
+                                      self.__get_pixels(size, ratio))
+            for size in self.__sizes
+            )
+        key = (variant, frames, ratio)
+        icon = self.__icons.pop(key, None)
+        if icon is None:
+            icon = QIcon()
+            for size in self.__sizes:
+                icon.addPixmap(self.pixmap(variant, fraction, size, ratio))
+        self.__icons[key] = icon
+        while len(self.__icons) > self.__max_frames // len(self.__sizes):
+            self.__icons.popitem(last=False)
+        return icon
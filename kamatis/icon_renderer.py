@@ -0,0 +1,84 @@
+import math
+
+from PyQt5.QtCore import (
+    QByteArray,
+    QFile,
+    QIODevice,
+    QRectF,
+    Qt,
+    )
+from PyQt5.QtGui import (
+    QImage,
+    QPainter,
+    QPixmap,
+    )
+from PyQt5.QtSvg import QSvgRenderer
+
+
+class IconRenderer(object):
+    """Draws the tray icon at any size and for any fraction of a period.
+
+    The tomato is drawn from the SVG and the elapsed part of the period is
+    cut away clockwise from 12 o'clock. Fractions are rounded to the frames
+    that actually look different at the given pixel size, so callers can ask
+    for as many steps as they like.
+    """
+
+    SOURCE = ':/kamatis.svg'
+
+    # The red and green of the tomato and their paused shades of gray.
+    PAUSED_COLORS = (
+        (b'#dd2e44', b'#555555'),
+        (b'#77b255', b'#a0a0a0'),
+        )
+
+    def __init__(self):
+        self.__svgs = {}
+
+    def __get_svg(self, variant):
+        svg = self.__svgs.get(variant)
+        if svg is None:
+            source = QFile(self.SOURCE)
+            source.open(QIODevice.ReadOnly)
+            data = bytes(source.readAll())
+            source.close()
+            if variant == 'paused':
+                for color, gray in self.PAUSED_COLORS:
+                    data = data.replace(color, gray)
+            svg = QSvgRenderer(QByteArray(data))
+            self.__svgs[variant] = svg
+        return svg
+
+    def get_frame_count(self, pixels):
+        """Return how many frames differ at a size of `pixels`.
+
+        Moving the cut by less than a pixel along the rim is not visible.
+        """
+        return max(1, int(math.pi * pixels))
+
+    def get_frame(self, fraction, pixels):
+        frames = self.get_frame_count(pixels)
+        return min(int(fraction * frames), frames - 1)
+
+    def render(self, variant, frame, pixels, ratio=1.0):
+        """Return a pixmap of `frame` out of those at `pixels` in size."""
+        image = QImage(pixels, pixels, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        self.__get_svg(variant).render(painter, QRectF(0, 0, pixels, pixels))
+        if frame:
+            # The pie is twice the icon size so it reaches the corners.
+            painter.setCompositionMode(QPainter.CompositionMode_Clear)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(Qt.black)
+            angle = 360 * 16 * frame / self.get_frame_count(pixels)
+            painter.drawPie(
+                QRectF(-pixels / 2.0, -pixels / 2.0, pixels * 2, pixels * 2),
+                90 * 16,
+                -int(round(angle)),
+                )
+        painter.end()
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(ratio)
+        return pixmap
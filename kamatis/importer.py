@@ -0,0 +1,341 @@
+import csv
+import datetime
+import heapq
+import io
+import json
+import logging
+import re
+import sqlite3
+import time
+
+from kamatis.history import PeriodRecord
+
+# Column names used by other tools, mapped to ours. Durations are in seconds
+# unless the name says otherwise.
+ALIASES = {
+    'start': ('start', 'started', 'started_at', 'start_time', 'starttime',
+              'begin', 'from', 'date'),
+    'end': ('end', 'ended', 'ended_at', 'end_time', 'endtime', 'finish',
+            'finished_at', 'to'),
+    'duration': ('duration', 'actual', 'length', 'seconds',
+                 'duration_seconds'),
+    'minutes': ('minutes', 'duration_minutes', 'duration_min', 'length_min'),
+    'planned': ('planned', 'planned_duration', 'target'),
+    'period': ('period', 'type', 'kind', 'mode', 'session_type', 'category'),
+    'outcome': ('outcome', 'status', 'state', 'result'),
+    'pauses': ('pauses', 'interruptions'),
+    'task': ('task', 'task_name', 'project', 'label', 'tag', 'description'),
+    }
+
+PERIODS = {
+    'work': 'work',
+    'pomodoro': 'work',
+    'focus': 'work',
+    'session': 'work',
+    'short break': 'short break',
+    'break': 'short break',
+    'long break': 'long break',
+    }
+
+OUTCOMES = {
+    'finished': 'finished',
+    'completed': 'finished',
+    'complete': 'finished',
+    'done': 'finished',
+    'skipped': 'skipped',
+    'cancelled': 'skipped',
+    'canceled': 'skipped',
+    'interrupted': 'skipped',
+    'abandoned': 'skipped',
+    'reset': 'reset',
+    'stopped': 'reset',
+    }
+
+__PERIOD_NAMES = frozenset(PERIODS.values())
+__OUTCOME_NAMES = frozenset(OUTCOMES.values())
+
+__ISO_RE = re.compile(
+    r'^(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d)(?::(\d\d)(?:\.(\d+))?)?'
+    r'\s*(Z|[+-]\d\d:?\d\d)?$'
+    )
+
+
+def parse_timestamp(value):
+    """Return a Unix timestamp from a number or an ISO 8601 string."""
+    if isinstance(value, (int, float)):
+        timestamp = float(value)
+    else:
+        value = value.strip()
+        try:
+            timestamp = float(value)
+        except ValueError:
+            return __parse_iso(value)
+    # Some tools store milliseconds.
+    if timestamp > 1e11:
+        timestamp /= 1000.0
+    return timestamp
+
+
+def __parse_iso(value):
+    match = __ISO_RE.match(value)
+    if match is None:
+        raise ValueError('Invalid time: {}'.format(value))
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    parts = [int(year), int(month), int(day), int(hour), int(minute),
+             int(second or 0)]
+    fraction = float('0.{}'.format(fraction)) if fraction else 0
+    if zone is None:
+        # Local time.
+        return time.mktime(tuple(parts) + (0, 0, -1)) + fraction
+    offset = 0
+    if zone != 'Z':
+        sign = -1 if zone[0] == '-' else 1
+        zone = zone[1:].replace(':', '')
+        offset = sign * (int(zone[:2]) * 3600 + int(zone[2:]) * 60)
+    utc = datetime.datetime(*parts) - datetime.datetime(1970, 1, 1)
+    return utc.total_seconds() + fraction - offset
+
+
+# Rows of a file share their columns, so the lookup of which column holds
+# what is only done once per set of columns.
+__columns = {}
+
+
+def __get_columns(keys):
+    columns = __columns.get(keys)
+    if columns is None:
+        names = dict((str(key).strip().lower().replace(' ', '_'), key)
+                     for key in keys)
+        columns = dict(
+            (field, tuple(names[alias] for alias in aliases
+                          if alias in names))
+            for field, aliases in ALIASES.items()
+            )
+        if len(__columns) > 100:
+            __columns.clear()
+        __columns[keys] = columns
+    return columns
+
+
+def __get(row, columns):
+    for column in columns:
+        value = row[column]
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def normalize(row):
+    """Turn a row of another tool into a PeriodRecord."""
+    columns = __get_columns(tuple(row))
+    start = __get(row, columns['start'])
+    if start is None:
+        raise ValueError('Missing start time.')
+    start = parse_timestamp(start)
+
+    end = __get(row, columns['end'])
+    duration = __get(row, columns['duration'])
+    minutes = __get(row, columns['minutes'])
+    if duration is not None:
+        duration = float(duration)
+    elif minutes is not None:
+        duration = float(minutes) * 60
+    if end is not None:
+        end = parse_timestamp(end)
+        if duration is None:
+            duration = end - start
+    elif duration is not None:
+        end = start + duration
+    else:
+        raise ValueError('Missing end time or duration.')
+    if end < start:
+        raise ValueError('Period ends before it starts.')
+
+    period = __get(row, columns['period'])
+    period = PERIODS.get(period, period) if period is not None else 'work'
+    if period not in __PERIOD_NAMES:
+        period = PERIODS.get(
+            str(period).strip().lower().replace('_', ' ').replace('-', ' '))
+        if period is None:
+            raise ValueError('Unknown period type.')
+    outcome = __get(row, columns['outcome'])
+    if outcome is None:
+        outcome = 'finished'
+    elif outcome not in __OUTCOME_NAMES:
+        outcome = OUTCOMES.get(str(outcome).strip().lower(), 'finished')
+    planned = __get(row, columns['planned'])
+    planned = float(planned) if planned is not None else duration
+    pauses = int(__get(row, columns['pauses']) or 0)
+    task = __get(row, columns['task']) if period == 'work' else None
+
+    return PeriodRecord(start, end, period, outcome, planned, duration,
+                        pauses, task)
+
+
+def __iter_json(stream, chunk_size=65536):
+    # Decode one value at a time so huge arrays do not have to fit in memory.
+    decoder = json.JSONDecoder()
+    buf = ''
+    eof = False
+    while True:
+        buf = buf.lstrip(' \t\r\n,[')
+        if buf.startswith(']'):
+            return
+        if buf:
+            try:
+                value, index = decoder.raw_decode(buf)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                buf = buf[index:]
+                yield value
+                continue
+        if eof:
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf += chunk
+
+
+def iter_rows(stream, fmt=None):
+    """Yield the rows of a CSV, JSON or JSON Lines stream as dicts."""
+    if fmt is None:
+        head = stream.read(1)
+        while head and head.isspace():
+            head = stream.read(1)
+        fmt = 'json' if head in ('[', '{') else 'csv'
+        stream = __Prepended(head, stream)
+    if fmt == 'csv':
+        return csv.DictReader(stream)
+    if fmt == 'json':
+        return __iter_json(stream)
+    raise ValueError('Unknown format: {}'.format(fmt))
+
+
+class __Prepended(object):
+    """File-like object that gives back what was read to sniff the format."""
+
+    def __init__(self, head, stream):
+        self.__head = head
+        self.__stream = stream
+
+    def read(self, size=-1):
+        head, self.__head = self.__head, ''
+        if size is None or size < 0:
+            return head + self.__stream.read()
+        return head + self.__stream.read(size - len(head))
+
+    def __iter__(self):
+        head, self.__head = self.__head, ''
+        first = True
+        for line in self.__stream:
+            if first:
+                line = head + line
+                first = False
+            yield line
+        if first and head:
+            yield head
+
+
+def __merge(staged, existing):
+    """Yield the staged records that do not overlap anything.
+
+    Both inputs must be sorted by start time. Existing rows are (start, end).
+    """
+    covered_until = float('-inf')
+    pending = None
+    streams = heapq.merge(
+        ((row[0], 0, row) for row in existing),
+        ((row.start, 1, row) for row in staged),
+        )
+    for start, incoming, row in streams:
+        if pending is not None and start >= pending.end:
+            yield pending
+            pending = None
+        if not incoming:
+            if pending is not None:
+                # An imported period overlapping one we already have.
+                pending = None
+            covered_until = max(covered_until, row[1])
+        elif start >= covered_until:
+            pending = row
+            covered_until = row.end
+    if pending is not None:
+        yield pending
+
+
+def import_history(store, streams, fmt=None, batch_size=5000):
+    """Import the periods in `streams` into `store`, skipping overlaps.
+
+    Returns `(read, imported, rejected)` where rejected rows are those that
+    could not be parsed.
+    """
+    read = imported = rejected = 0
+
+    # Stage the rows in a temporary table so SQLite sorts them, on disk if
+    # needed.
+    staging = sqlite3.connect('')
+    staging.execute(
+        'CREATE TABLE staging (start REAL, end REAL, period TEXT, '
+        'outcome TEXT, planned REAL, actual REAL, pauses INTEGER, '
+        'task TEXT)'
+        )
+    batch = []
+    for stream in streams:
+        for row in iter_rows(stream, fmt):
+            read += 1
+            try:
+                batch.append(normalize(row))
+            except (ValueError, TypeError, AttributeError):
+                rejected += 1
+                continue
+            if len(batch) >= batch_size:
+                staging.executemany(
+                    'INSERT INTO staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    batch)
+                batch = []
+    if batch:
+        staging.executemany(
+            'INSERT INTO staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    if rejected:
+        logging.warning('Skipped %d rows that could not be read.', rejected)
+
+    first = staging.execute('SELECT MIN(start) FROM staging').fetchone()[0]
+    if first is None:
+        staging.close()
+        return read, 0, rejected
+
+    store.flush()
+    existing = sqlite3.connect(store.path)
+    existing_rows = existing.execute(
+        'SELECT start, end FROM periods WHERE end > ? ORDER BY start',
+        (first,),
+        )
+    staged_rows = (PeriodRecord(*row) for row in staging.execute(
+        'SELECT * FROM staging ORDER BY start'))
+
+    batch = []
+    for record in __merge(staged_rows, existing_rows):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            store.insert(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        store.insert(batch)
+        imported += len(batch)
+
+    existing.close()
+    staging.close()
+    return read, imported, rejected
+
+
+def open_input(path):
+    if path == '-':
+        import sys
+        return sys.stdin
+    if path.endswith('.gz'):
+        import gzip
+        return io.TextIOWrapper(gzip.open(path, 'rb'), newline='')
+    return io.open(path, 'r', newline='')
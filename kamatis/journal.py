@@ -0,0 +1,135 @@
+import json
+import logging
+import numbers
+import os
+import time
+
+from kamatis.engine import TimerEngine
+
+
+def is_number(value):
+    return (isinstance(value, numbers.Real)
+            and not isinstance(value, bool))
+
+
+def is_snapshot(snapshot):
+    """Return whether `snapshot` can be given to `TimerEngine.restore()`."""
+    if len(snapshot) != 5:
+        return False
+    state, period, period_counter, remaining, length = snapshot
+    if not (isinstance(period_counter, numbers.Integral)
+            and not isinstance(period_counter, bool)):
+        return False
+    if state == 'STOPPED':
+        return True
+    return (state in ('RUNNING', 'PAUSED')
+            and period in TimerEngine.PERIODS
+            and is_number(remaining)
+            and is_number(length))
+
+
+class Journal(object):
+    """Append-only log of engine snapshots used to resume after a crash.
+
+    Each line holds the wall clock time and an engine snapshot. Appends are
+    only written to the OS, `sync()` does the fsync and is meant to be called
+    in batches. The file is rewritten down to its last record every
+    `MAX_RECORDS` appends.
+    """
+
+    MAX_RECORDS = 1000
+
+    def __init__(self, path):
+        self.__path = path
+        self.__file = None
+        self.__records = 0
+        self.__dirty = False
+        self.__last = None
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def dirty(self):
+        return self.__dirty
+
+    def load(self):
+        """Return the last complete `(wall_time, snapshot)` or None."""
+        try:
+            with open(self.__path, 'r') as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            return None
+
+        # A crash may have left a partial line at the end. Records that are
+        # not engine snapshots are skipped as well.
+        for line in reversed(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, list) or not record:
+                continue
+            wall_time, snapshot = record[0], tuple(record[1:])
+            if is_number(wall_time) and is_snapshot(snapshot):
+                self.__last = line.rstrip('\n') + '\n'
+                return wall_time, snapshot
+        return None
+
+    def append(self, snapshot, wall_time=None):
+        if wall_time is None:
+            wall_time = time.time()
+        line = json.dumps([wall_time] + list(snapshot),
+                          separators=(',', ':'))
+        line += '\n'
+        self.__last = line
+
+        if self.__records >= self.MAX_RECORDS:
+            self.compact()
+            return
+
+        try:
+            if self.__file is None:
+                self.__file = open(self.__path, 'a')
+            self.__file.write(line)
+            self.__file.flush()
+        except (IOError, OSError):
+            logging.warning('Cannot write to journal.', exc_info=True)
+            return
+        self.__records += 1
+        self.__dirty = True
+
+    def sync(self):
+        if not self.__dirty or self.__file is None:
+            return
+        try:
+            os.fsync(self.__file.fileno())
+        except (IOError, OSError):
+            logging.warning('Cannot sync journal.', exc_info=True)
+            return
+        self.__dirty = False
+
+    def compact(self):
+        """Replace the journal with a file holding only the last record."""
+        self.close()
+        if self.__last is None:
+            return
+
+        temp_path = '{}.tmp'.format(self.__path)
+        try:
+            with open(temp_path, 'w') as f:
+                f.write(self.__last)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(temp_path, self.__path)
+        except (IOError, OSError):
+            logging.warning('Cannot compact journal.', exc_info=True)
+            return
+        self.__records = 1
+
+    def close(self):
+        self.sync()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
@@ -0,0 +1,83 @@
+import contextlib
+import time
+
+from kamatis import __version__
+from kamatis.clock import monotonic
+
+
+class _NullProfile(object):
+    """Stands in for StartupProfile when startup is not being profiled."""
+
+    def __bool__(self):
+        return False
+
+    __nonzero__ = __bool__
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+
+class _NullPhase(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+NULL_PROFILE = _NullProfile()
+
+
+class StartupProfile(object):
+    """Times the phases of startup for reporting as JSON.
+
+    Phases are timed with the monotonic clock from when the profile is
+    made, and may nest; the report lists them in the order they started.
+    """
+
+    def __init__(self, clock=monotonic):
+        self.__clock = clock
+        self.__started = clock()
+        self.__started_at = time.time()
+        self.__phases = []
+
+    def __bool__(self):
+        return True
+
+    __nonzero__ = __bool__
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        entry = [name, self.__clock() - self.__started, None]
+        self.__phases.append(entry)
+        try:
+            yield self
+        finally:
+            entry[2] = self.__clock() - self.__started - entry[1]
+
+    def as_dict(self):
+        return {
+            'version': __version__,
+            'started_at': self.__started_at,
+            'total_ms': round((self.__clock() - self.__started) * 1000, 3),
+            'phases': [
+                {
+                    'name': name,
+                    'start_ms': round(start * 1000, 3),
+                    'duration_ms': (
+                        None if duration is None
+                        else round(duration * 1000, 3)
+                        ),
+                    }
+                for name, start, duration in self.__phases
+                ],
+            }
+
+    def write(self, stream):
+        import json
+
+        json.dump(self.as_dict(), stream, indent=2, sort_keys=True)
+        stream.write('\n')
+        stream.flush()
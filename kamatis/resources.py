@@ -0,0 +1,52 @@
+import os
+import pkgutil
+
+from PyQt5.QtCore import (
+    QFile,
+    QResource,
+    QSize,
+    )
+from PyQt5.QtGui import QIcon
+
+RCC_NAME = 'res.rcc'
+
+# Pixel sizes of the PNGs made by tools/build_icons.py.
+ICON_PIXELS = (16, 22, 24, 32, 44, 48, 64, 96)
+
+ICON_TEMPLATE = ':/icons/kamatis-{}.png'
+
+# Qt does not copy data given to registerResourceData(), so it has to stay
+# alive for as long as it is registered.
+__data = []
+
+
+def register():
+    """Make the bundled resources available under ':/'.
+
+    The bundle is memory-mapped by Qt when it is a plain file. Installs
+    where it is inside a zip fall back to reading it into memory.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), RCC_NAME)
+    if os.path.isfile(path) and QResource.registerResource(path):
+        return True
+    data = pkgutil.get_data(__name__.rpartition('.')[0], RCC_NAME)
+    if data is None or not QResource.registerResourceData(data):
+        return False
+    __data.append(data)
+    return True
+
+
+def get_icon():
+    """Return the app icon with a pre-rendered PNG for every common size.
+
+    Qt picks the PNG closest to the size it draws at. Without the PNGs the
+    icon is drawn from the SVG.
+    """
+    icon = QIcon()
+    for pixels in ICON_PIXELS:
+        path = ICON_TEMPLATE.format(pixels)
+        if QFile.exists(path):
+            icon.addFile(path, QSize(pixels, pixels))
+    if icon.isNull():
+        icon = QIcon(':/kamatis.svg')
+    return icon
@@ -0,0 +1,167 @@
+import heapq
+import itertools
+
+from kamatis.clock import monotonic
+
+
+class Timeline(object):
+    """Ordered events that share a clock which can be paused as a whole.
+
+    Event times are local to the timeline. Local time only advances while the
+    timeline is running, so pausing and resuming is O(1) no matter how many
+    events are scheduled.
+    """
+
+    __slots__ = (
+        '__scheduler',
+        '__events',
+        '__offset',
+        '__paused_at',
+        '_entry',
+        )
+
+    def __init__(self, scheduler):
+        self.__scheduler = scheduler
+        # Heap of [time, seq, callback, precise]. Cancelled events have their
+        # callback set to None and are dropped once they reach the top.
+        self.__events = []
+        self.__offset = scheduler.now()
+        self.__paused_at = None
+        # Entry of this timeline in the scheduler queue, if any.
+        self._entry = None
+
+    @property
+    def paused(self):
+        return self.__paused_at is not None
+
+    def now(self):
+        if self.__paused_at is not None:
+            return self.__paused_at
+        return self.__scheduler.now() - self.__offset
+
+    def call_at(self, when, callback, precise=False):
+        event = [when, next(self.__scheduler._counter), callback, precise]
+        heapq.heappush(self.__events, event)
+        if self.__events[0] is event:
+            self.__register()
+        return event
+
+    def cancel(self, event):
+        event[2] = None
+
+    def clear(self):
+        self.__events = []
+        self.__scheduler._invalidate(self)
+
+    def pause(self):
+        if self.__paused_at is not None:
+            return
+        self.__paused_at = self.now()
+        self.__scheduler._invalidate(self)
+
+    def resume(self):
+        if self.__paused_at is None:
+            return
+        self.__offset = self.__scheduler.now() - self.__paused_at
+        self.__paused_at = None
+        self.__register()
+
+    def __register(self):
+        events = self.__events
+        while events and events[0][2] is None:
+            heapq.heappop(events)
+        if self.__paused_at is not None or not events:
+            self.__scheduler._invalidate(self)
+            return
+        when, _, _, precise = events[0]
+        self.__scheduler._register(self, when + self.__offset, precise)
+
+    def _fire(self, now):
+        # Compare in scheduler time, exactly like the queue entry was computed,
+        # so rounding cannot make a due event look early.
+        events = self.__events
+        while events and events[0][2] is None:
+            heapq.heappop(events)
+        if events and events[0][0] + self.__offset <= now:
+            _, _, callback, _ = heapq.heappop(events)
+            callback()
+        self.__register()
+
+
+class Scheduler(object):
+    """Single queue of deadlines for any number of timelines.
+
+    The owner arms one OS timer for `next_event()` and calls `run_due()` when
+    it fires.
+    """
+
+    def __init__(self, clock=None):
+        # Plain attribute instead of a method, this is on every hot path.
+        self.now = clock or monotonic
+        # Heap of [when, seq, timeline, precise]. An entry is only valid while
+        # it is the `_entry` of its timeline.
+        self.__queue = []
+        self.__stale = 0
+        self._counter = itertools.count()
+
+    def timeline(self):
+        return Timeline(self)
+
+    def _register(self, timeline, when, precise):
+        entry = timeline._entry
+        if entry is not None:
+            if entry[0] == when and entry[3] == precise:
+                return
+            self.__stale += 1
+        entry = [when, next(self._counter), timeline, precise]
+        timeline._entry = entry
+        heapq.heappush(self.__queue, entry)
+        self.__compact()
+
+    def _invalidate(self, timeline):
+        if timeline._entry is not None:
+            timeline._entry = None
+            self.__stale += 1
+            self.__compact()
+
+    def __compact(self):
+        queue = self.__queue
+        if self.__stale < 1024 or self.__stale * 2 < len(queue):
+            return
+        queue[:] = [e for e in queue if e[2]._entry is e]
+        heapq.heapify(queue)
+        self.__stale = 0
+
+    def __drop_stale(self):
+        queue = self.__queue
+        while queue and queue[0][2]._entry is not queue[0]:
+            heapq.heappop(queue)
+            self.__stale -= 1
+
+    def next_event(self):
+        """Return `(when, precise)` of the earliest event, or None."""
+        self.__drop_stale()
+        if not self.__queue:
+            return None
+        when, _, _, precise = self.__queue[0]
+        return when, precise
+
+    def next_timeout(self):
+        """Return the seconds until `run_due()` has work to do, or None."""
+        event = self.next_event()
+        if event is None:
+            return None
+        return max(0, event[0] - self.now())
+
+    def run_due(self):
+        """Fire every event that is due by now, in deadline order."""
+        now = self.now()
+        queue = self.__queue
+        while True:
+            self.__drop_stale()
+            if not queue or queue[0][0] > now:
+                break
+            entry = heapq.heappop(queue)
+            timeline = entry[2]
+            timeline._entry = None
+            timeline._fire(now)
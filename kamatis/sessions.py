@@ -0,0 +1,90 @@
+import functools
+
+from kamatis.engine import (
+    Signal,
+    TimerEngine,
+    )
+from kamatis.scheduler import Scheduler
+
+
+class SessionManager(object):
+    """Many independent pomodoro sessions sharing a single scheduler.
+
+    Every session is a `TimerEngine` with its own settings. Their deadlines
+    all live in one queue, so the owner only needs one OS timer for
+    `next_timeout()` and each transition costs O(log n).
+    """
+
+    def __init__(self, clock=None, scheduler=None):
+        if scheduler is None:
+            scheduler = Scheduler(clock)
+        self.scheduler = scheduler
+        self.__sessions = {}
+
+        self.period_changed = Signal()
+        self.period_ended = Signal()
+
+    def __len__(self):
+        return len(self.__sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self.__sessions
+
+    def __iter__(self):
+        return iter(self.__sessions)
+
+    def create(self, session_id, start=True, **settings):
+        """Add a session. Settings are those of `TimerEngine.configure()`."""
+        if session_id in self.__sessions:
+            raise ValueError('Session {} already exists.'.format(session_id))
+        engine = TimerEngine(scheduler=self.scheduler)
+        engine.configure(**settings)
+        engine.period_changed.connect(
+            functools.partial(self.period_changed.emit, session_id))
+        engine.period_ended.connect(
+            functools.partial(self.period_ended.emit, session_id))
+        self.__sessions[session_id] = engine
+        if start:
+            engine.start()
+        return engine
+
+    def remove(self, session_id):
+        engine = self.__sessions.pop(session_id)
+        engine.reset()
+
+    def get(self, session_id):
+        return self.__sessions[session_id]
+
+    def configure(self, session_id, **settings):
+        self.__sessions[session_id].configure(**settings)
+
+    def start(self, session_id):
+        self.__sessions[session_id].start()
+
+    def pause(self, session_id):
+        self.__sessions[session_id].pause()
+
+    def resume(self, session_id):
+        self.__sessions[session_id].resume()
+
+    def skip(self, session_id):
+        self.__sessions[session_id].skip()
+
+    def reset(self, session_id):
+        self.__sessions[session_id].reset()
+
+    def query(self, session_id):
+        engine = self.__sessions[session_id]
+        return {
+            'state': engine.state,
+            'period': engine.period,
+            'period_counter': engine.period_counter,
+            'progress': engine.progress,
+            'remaining': engine.get_remaining_time(),
+            }
+
+    def next_timeout(self):
+        return self.scheduler.next_timeout()
+
+    def run_due(self):
+        self.scheduler.run_due()
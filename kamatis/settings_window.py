@@ -2,14 +2,10 @@ from PyQt5.QtCore import (
     pyqtSignal,
     QUrl,
     )
-from PyQt5.QtGui import QIcon
-from PyQt5.QtMultimedia import (
-    QMediaContent,
-    QMediaPlayer,
-    )
 from PyQt5.QtWidgets import (
     QApplication,
     QCheckBox,
+    QComboBox,
     QDialogButtonBox,
     QFormLayout,
     QMainWindow,
@@ -19,6 +15,7 @@ from PyQt5.QtWidgets import (
     QWidget,
     )
 
+from kamatis import resources
 from kamatis.ext.pyqtconfig import RECALCULATE_ALL
 from kamatis.sound_combo_box import SoundComboBox
 
@@ -33,10 +30,8 @@ class SettingsWidget(QWidget):
         self.__default_settings = self.__app.default_settings
         self.__orig_settings = self.__get_app_settings()
 
-        player = QMediaPlayer(self)
-        player.stateChanged.connect(self.__on_player_state_change)
-        player.mediaStatusChanged.connect(self.__on_player_status_change)
-        self.__player = player
+        # QtMultimedia is only loaded once a sound is chosen.
+        self.__player = None
 
         self.setLayout(QFormLayout())
         self.__populate_layout()
@@ -85,6 +80,42 @@ class SettingsWidget(QWidget):
         self.__settings.add_handler('autostart', autostart_check_box)
         layout.addRow('&Autostart:', autostart_check_box)
 
+        sleep_policy_combo_box = QComboBox(self)
+        sleep_policies = {
+            'Pause the timer': 'pause',
+            'Count it as a break': 'break',
+            }
+        sleep_policy_combo_box.addItems(sorted(sleep_policies.keys()))
+        text = 'What to do when the computer sleeps during a period'
+        sleep_policy_combo_box.setToolTip(text)
+        self.__settings.add_handler(
+            'sleep_policy',
+            sleep_policy_combo_box,
+            mapper=sleep_policies,
+            )
+        layout.addRow('When &sleeping:', sleep_policy_combo_box)
+
+        event_retention_spin_box = QSpinBox(self)
+        event_retention_spin_box.setRange(0, 3650)
+        event_retention_spin_box.setSuffix(' days')
+        event_retention_spin_box.setSpecialValueText('Forever')
+        text = 'How long to keep every start, pause and resume in the history'
+        event_retention_spin_box.setToolTip(text)
+        self.__settings.add_handler('event_retention_days',
+                                    event_retention_spin_box)
+        layout.addRow('Keep e&vents:', event_retention_spin_box)
+
+        period_retention_spin_box = QSpinBox(self)
+        period_retention_spin_box.setRange(0, 36500)
+        period_retention_spin_box.setSuffix(' days')
+        period_retention_spin_box.setSpecialValueText('Forever')
+        text = 'How long to keep each period in the history, daily totals ' \
+            'are kept forever'
+        period_retention_spin_box.setToolTip(text)
+        self.__settings.add_handler('period_retention_days',
+                                    period_retention_spin_box)
+        layout.addRow('Keep pe&riods:', period_retention_spin_box)
+
         sound_combo_box = SoundComboBox(self)
         sound_combo_box.currentIndexChanged.connect(self.__on_choose_sound)
         self.__sound_combo_box = sound_combo_box
@@ -121,21 +152,39 @@ class SettingsWidget(QWidget):
         enabled = sound_file_path not in self.__app.NO_SOUND_VALS
         self.__test_sound_button.setEnabled(enabled)
         if enabled:
+            from PyQt5.QtMultimedia import QMediaContent
+
             media_content = QMediaContent(QUrl.fromLocalFile(sound_file_path))
-            self.__player.setMedia(media_content)
+            self.__get_player().setMedia(media_content)
+
+    def __get_player(self):
+        if self.__player is None:
+            from PyQt5.QtMultimedia import QMediaPlayer
+
+            player = QMediaPlayer(self)
+            player.stateChanged.connect(self.__on_player_state_change)
+            player.mediaStatusChanged.connect(self.__on_player_status_change)
+            self.__player = player
+        return self.__player
 
     def __on_test_sound_clicked(self, checked):
+        from PyQt5.QtMultimedia import QMediaPlayer
+
         if self.__player.state() == QMediaPlayer.StoppedState:
             self.__player.play()
         else:
             self.__player.stop()
 
     def __on_player_status_change(self, status):
+        from PyQt5.QtMultimedia import QMediaPlayer
+
         if status == QMediaPlayer.InvalidMedia:
             self.__show_unplayable_warning()
             self.__sound_combo_box.restore_previous_choice()
 
     def __on_player_state_change(self, state):
+        from PyQt5.QtMultimedia import QMediaPlayer
+
         if state == QMediaPlayer.PlayingState:
             self.__sound_combo_box.setEnabled(False)
             self.__test_sound_button.setText('Stop test')
@@ -187,6 +236,15 @@ class SettingsWidget(QWidget):
         msg_box.setStandardButtons(QMessageBox.Ok)
         msg_box.exec_()
 
+    def release(self):
+        """Stop syncing the widgets with the settings before deletion."""
+        if self.__player is not None:
+            self.__player.stop()
+        for key, handler in list(self.__settings.handlers.items()):
+            if self.isAncestorOf(handler):
+                self.__settings.remove_handler(key)
+        self.__settings.updated.disconnect(self.__on_update_settings)
+
     def has_pending_changes(self):
         return self.__orig_settings != self.__new_settings
 
@@ -205,7 +263,7 @@ class SettingsWindow(QMainWindow):
         super(SettingsWindow, self).__init__()
         application_name = QApplication.applicationName()
         self.setWindowTitle('{} Settings'.format(application_name))
-        self.setWindowIcon(QIcon(':/kamatis.svg'))
+        self.setWindowIcon(resources.get_icon())
 
         self.__settings_widget = SettingsWidget(self)
         self.setCentralWidget(self.__settings_widget)
@@ -215,11 +273,16 @@ class SettingsWindow(QMainWindow):
         desktop = QApplication.desktop()
         width = desktop.width()
         height = desktop.height()
-        x = (width - self.width()) / 2
-        y = (height - self.height()) / 2
+        x = (width - self.width()) // 2
+        y = (height - self.height()) // 2
         self.move(x, y)
         return super(SettingsWindow, self).showEvent(event)
 
+    def release(self):
+        """Delete the window, the settings stay in the app's ConfigManager."""
+        self.__settings_widget.release()
+        self.deleteLater()
+
     def closeEvent(self, event):
         if self.__settings_widget.has_pending_changes():
             self.__confirm_changes()
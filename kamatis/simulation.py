@@ -0,0 +1,55 @@
+from kamatis.clock import VirtualClock
+from kamatis.engine import TimerEngine
+from kamatis.scheduler import Scheduler
+
+
+class Simulator(object):
+    """Runs timer engines on a virtual clock as fast as possible.
+
+    Instead of sleeping, the clock jumps straight to the next deadline, so the
+    engines go through exactly the same transitions as they would in real
+    time.
+    """
+
+    def __init__(self, start=0.0):
+        self.clock = VirtualClock(start)
+        self.scheduler = Scheduler(self.clock)
+        self.__actions = self.scheduler.timeline()
+        self.__start = start
+
+    def engine(self, **settings):
+        engine = TimerEngine(scheduler=self.scheduler)
+        engine.configure(**settings)
+        return engine
+
+    def call_at(self, when, action):
+        """Run `action` once the clock reaches `when`."""
+        return self.__actions.call_at(when - self.__start, action)
+
+    def record(self, engine):
+        """Return a list that is filled with `(time, signal, args)`."""
+        events = []
+
+        def recorder(name):
+            return lambda *args: events.append((self.clock.now, name, args))
+
+        for name in ('state_changed', 'period_changed', 'period_ended',
+                     'timer_updated', 'period_progressed'):
+            getattr(engine, name).connect(recorder(name))
+        return events
+
+    def run_until(self, end):
+        """Fire every event up to `end` and leave the clock there."""
+        scheduler = self.scheduler
+        clock = self.clock
+        while True:
+            event = scheduler.next_event()
+            if event is None or event[0] > end:
+                break
+            if event[0] > clock.now:
+                clock.now = event[0]
+            scheduler.run_due()
+        clock.now = max(clock.now, end)
+
+    def run_for(self, secs):
+        self.run_until(self.clock.now + secs)
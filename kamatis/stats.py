@@ -0,0 +1,106 @@
+import datetime
+import time
+
+from kamatis.history import get_day
+
+
+def _parse_day(day):
+    return datetime.date(*[int(part) for part in day.split('-')])
+
+
+class Rollups(object):
+    """Per-day, per-week and per-month focus totals updated incrementally.
+
+    Only work periods count. A pomodoro is a finished work period and focus
+    time is the time spent running in any work period. Every lookup is O(1).
+    """
+
+    def __init__(self):
+        # Keyed by YYYY-MM-DD, (ISO year, ISO week) and YYYY-MM. Values are
+        # [pomodoros, focus seconds].
+        self.__days = {}
+        self.__weeks = {}
+        self.__months = {}
+        self.__streak_end = None
+        self.__streak_length = 0
+
+    def add(self, record):
+        if record.period != 'work':
+            return
+        pomodoros = int(record.outcome == 'finished')
+        self.add_day(get_day(record.start), pomodoros, record.actual)
+
+    def add_day(self, day, pomodoros, focus):
+        date = _parse_day(day)
+        for totals, key in ((self.__days, day),
+                            (self.__weeks, date.isocalendar()[:2]),
+                            (self.__months, day[:7])):
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += pomodoros
+            entry[1] += focus
+        if pomodoros:
+            self.__extend_streak(date)
+
+    def __extend_streak(self, date):
+        one_day = datetime.timedelta(days=1)
+        end = self.__streak_end
+        if end is None or date > end + one_day:
+            self.__streak_end = date
+            self.__streak_length = 1
+        elif date == end + one_day:
+            self.__streak_end = date
+            self.__streak_length += 1
+        elif date == end - self.__streak_length * one_day:
+            # The day right before the streak, which may join an older one.
+            self.__count_streak()
+
+    def __count_streak(self):
+        # Only needed when days are added out of order.
+        length = 0
+        date = self.__streak_end
+        while self.__days.get(date.isoformat(), (0,))[0]:
+            length += 1
+            date -= datetime.timedelta(days=1)
+        self.__streak_length = length
+
+    def __get(self, totals, key):
+        pomodoros, focus = totals.get(key, (0, 0))
+        return pomodoros, focus
+
+    def day(self, timestamp=None):
+        """Return `(pomodoros, focus seconds)` of the day of `timestamp`."""
+        if timestamp is None:
+            timestamp = time.time()
+        return self.__get(self.__days, get_day(timestamp))
+
+    def week(self, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        date = datetime.date.fromtimestamp(timestamp)
+        return self.__get(self.__weeks, date.isocalendar()[:2])
+
+    def month(self, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        return self.__get(self.__months, get_day(timestamp)[:7])
+
+    def streak(self, timestamp=None):
+        """Return the number of consecutive days with pomodoros.
+
+        A streak is still current if its last day was yesterday.
+        """
+        if self.__streak_end is None:
+            return 0
+        if timestamp is None:
+            timestamp = time.time()
+        today = datetime.date.fromtimestamp(timestamp)
+        if self.__streak_end < today - datetime.timedelta(days=1):
+            return 0
+        return self.__streak_length
+
+    @classmethod
+    def from_history(cls, store):
+        rollups = cls()
+        for day, pomodoros, focus in store.daily():
+            rollups.add_day(day, pomodoros, focus)
+        return rollups
@@ -0,0 +1,61 @@
+from PyQt5.QtWidgets import (
+    QApplication,
+    QDialog,
+    QDialogButtonBox,
+    QLineEdit,
+    QListWidget,
+    QVBoxLayout,
+    )
+
+
+class TaskPicker(QDialog):
+    """Dialog for picking a task by name, matching as the user types."""
+
+    MAX_MATCHES = 10
+
+    def __init__(self, parent=None):
+        super(TaskPicker, self).__init__(parent)
+        self.__app = QApplication.instance()
+        self.setWindowTitle('Choose task')
+
+        self.__line_edit = QLineEdit(self)
+        self.__line_edit.setPlaceholderText('Task name')
+        self.__line_edit.textChanged.connect(self.__on_text_changed)
+
+        self.__list = QListWidget(self)
+        self.__list.itemActivated.connect(self.__on_item_activated)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel,
+            parent=self,
+            )
+        buttons.accepted.connect(self.__on_accepted)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.__line_edit)
+        layout.addWidget(self.__list)
+        layout.addWidget(buttons)
+
+    def showEvent(self, event):
+        self.__line_edit.setText(self.__app.task or '')
+        self.__line_edit.selectAll()
+        self.__on_text_changed(self.__line_edit.text())
+        super(TaskPicker, self).showEvent(event)
+
+    def __on_text_changed(self, text):
+        index = self.__app.get_task_index()
+        self.__list.clear()
+        self.__list.addItems(index.search(text, self.MAX_MATCHES))
+
+    def __on_item_activated(self, item):
+        self.__line_edit.setText(item.text())
+        self.__on_accepted()
+
+    def __on_accepted(self):
+        item = self.__list.currentItem()
+        text = self.__line_edit.text().strip()
+        if item is not None and item.isSelected():
+            text = item.text()
+        self.__app.set_task(text or None)
+        self.accept()
@@ -0,0 +1,83 @@
+import bisect
+
+
+def _get_trigrams(text):
+    # The leading spaces favour matches at the start of the name.
+    text = '  {} '.format(text)
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class TaskIndex(object):
+    """In-memory index of task names for matching as the user types.
+
+    Names match case-insensitively, first by prefix and then by the number of
+    trigrams they share with the query. Ties go to the most recently used
+    name. Adding a name only touches the entries of that name.
+    """
+
+    def __init__(self, names=()):
+        # Lowercased names in order, for prefix lookups.
+        self.__sorted = []
+        # Lowercased name to [name, last use].
+        self.__names = {}
+        # Trigram to set of lowercased names.
+        self.__trigrams = {}
+        self.__uses = 0
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.__names)
+
+    def __contains__(self, name):
+        return name.lower() in self.__names
+
+    @property
+    def version(self):
+        """Number that changes whenever the index does."""
+        return self.__uses
+
+    def add(self, name):
+        """Add `name` or mark it as the most recently used."""
+        self.__uses += 1
+        key = name.lower()
+        entry = self.__names.get(key)
+        if entry is not None:
+            entry[0] = name
+            entry[1] = self.__uses
+            return
+        self.__names[key] = [name, self.__uses]
+        bisect.insort(self.__sorted, key)
+        for trigram in _get_trigrams(key):
+            self.__trigrams.setdefault(trigram, set()).add(key)
+
+    def recent(self, limit=10):
+        """Return the most recently used names, latest first."""
+        entries = sorted(self.__names.values(), key=lambda entry: -entry[1])
+        return [name for name, _ in entries[:limit]]
+
+    def search(self, query, limit=10):
+        """Return up to `limit` names matching `query`, best first."""
+        query = query.strip().lower()
+        if not query:
+            return self.recent(limit)
+
+        scores = {}
+        first = bisect.bisect_left(self.__sorted, query)
+        for key in self.__sorted[first:]:
+            if not key.startswith(query):
+                break
+            scores[key] = float('inf')
+        for trigram in _get_trigrams(query):
+            for key in self.__trigrams.get(trigram, ()):
+                if key not in scores or scores[key] != float('inf'):
+                    scores[key] = scores.get(key, 0) + 1
+
+        # Leave out names sharing too little with the query.
+        needed = max(1, len(query) // 2)
+        names = self.__names
+        matches = sorted(
+            (key for key, score in scores.items() if score >= needed),
+            key=lambda key: (-scores[key], -names[key][1]),
+            )
+        return [names[key][0] for key in matches[:limit]]
@@ -1,9 +1,52 @@
+from kamatis import export
+from kamatis import importer
 from kamatis import util
+from kamatis.clock import (
+    SleepDetector,
+    VirtualClock,
+    )
+from kamatis.engine import TimerEngine
+from kamatis.history import (
+    EventRecord,
+    HistoryRecorder,
+    HistoryStore,
+    PeriodRecord,
+    )
+from kamatis.journal import Journal
+from kamatis.profiling import (
+    NULL_PROFILE,
+    StartupProfile,
+    )
+from kamatis.scheduler import Scheduler
+from kamatis.sessions import SessionManager
+from kamatis.simulation import Simulator
+from kamatis.stats import Rollups
+from kamatis.tasks import TaskIndex
+import contextlib
+import gc
+import io
+import json
 import os
 import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
 import tempfile
+import threading
+import time
 import unittest
 
+try:
+    from kamatis import analytics
+except ImportError:  # NumPy is optional.
+    analytics = None
+
+try:
+    import PyQt5
+except ImportError:
+    PyQt5 = None
+
 
 class TestMakedirs(unittest.TestCase):
 
@@ -37,5 +80,1459 @@ class TestMakedirs(unittest.TestCase):
         os.rmdir(parent)
 
 
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'kamatis.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_load_last(self):
+        journal = Journal(self.path)
+        self.assertIsNone(journal.load())
+        journal.append(('RUNNING', 'work', 0, 1500, 1500), wall_time=10)
+        journal.append(('PAUSED', 'work', 0, 1200, 1500), wall_time=310)
+        journal.close()
+        snapshot = ('PAUSED', 'work', 0, 1200, 1500)
+        self.assertEqual(Journal(self.path).load(), (310, snapshot))
+
+    def test_torn_write(self):
+        journal = Journal(self.path)
+        journal.append(('RUNNING', 'work', 0, 1500, 1500), wall_time=10)
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('[20,"PAUSED","wo')
+        snapshot = ('RUNNING', 'work', 0, 1500, 1500)
+        self.assertEqual(Journal(self.path).load(), (10, snapshot))
+
+    def test_bad_records(self):
+        journal = Journal(self.path)
+        journal.append(('STOPPED', None, 0, None, None), wall_time=10)
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('{"state": "RUNNING"}\n')
+            f.write('42\n')
+            f.write('[]\n')
+            f.write('[20,"RUNNING","work",0,null,null]\n')
+            f.write('[20,"RUNNING","lunch",0,1500,1500]\n')
+            f.write('[20,"SLEEPING","work",0,1500,1500]\n')
+            f.write('[20,"PAUSED","work",0,"1500",1500]\n')
+            f.write('["20","PAUSED","work",0,1500,1500]\n')
+        snapshot = ('STOPPED', None, 0, None, None)
+        self.assertEqual(Journal(self.path).load(), (10, snapshot))
+
+    def test_compact(self):
+        journal = Journal(self.path)
+        journal.MAX_RECORDS = 10
+        for i in range(25):
+            journal.append(('RUNNING', 'work', 0, 1500 - i, 1500),
+                           wall_time=i)
+        journal.close()
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 5)
+        snapshot = ('RUNNING', 'work', 0, 1476, 1500)
+        self.assertEqual(Journal(self.path).load(), (24, snapshot))
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        path = os.path.join(self.tempdir, 'kamatis.sqlite')
+        self.store = HistoryStore(path)
+        self.store.open()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_query(self):
+        records = [
+            PeriodRecord(0, 1500, 'work', 'finished', 1500, 1500, 0),
+            PeriodRecord(1500, 1800, 'short break', 'finished', 300, 300, 0),
+            PeriodRecord(1800, 2000, 'work', 'skipped', 1500, 200, 0),
+            PeriodRecord(2000, 2400, 'short break', 'reset', 300, 100, 1),
+            ]
+        for record in reversed(records):
+            self.store.add(record)
+        self.store.flush()
+        self.assertEqual(self.store.query(), records)
+        self.assertEqual(self.store.query(1500, 2000), records[1:3])
+        self.assertEqual(self.store.query(period='work'),
+                         [records[0], records[2]])
+
+    def test_recorder(self):
+        simulator = Simulator(start=10000.0)
+        engine = simulator.engine(work=25, short_break=5)
+        recorder = HistoryRecorder(engine, self.store.add,
+                                   wall_clock=simulator.clock)
+        recorder.task = 'Report'
+        engine.start()
+        simulator.run_for(25 * 60)
+        simulator.run_for(60)
+        engine.pause()
+        simulator.run_for(60)
+        engine.resume()
+        simulator.run_for(60)
+        engine.skip()
+        engine.reset()
+        self.store.flush()
+        self.assertEqual(self.store.query(), [
+            PeriodRecord(10000, 11500, 'work', 'finished', 1500, 1500, 0,
+                         'Report'),
+            PeriodRecord(11500, 11680, 'short break', 'skipped', 300, 120, 1),
+            PeriodRecord(11680, 11680, 'work', 'reset', 1500, 0, 0,
+                         'Report'),
+            ])
+
+    def test_tasks(self):
+        self.store.add(PeriodRecord(0, 1500, 'work', 'finished', 1500, 1500,
+                                    0, 'Write report'))
+        self.store.add(PeriodRecord(1800, 3300, 'work', 'finished', 1500,
+                                    1500, 0, 'Email'))
+        self.store.add(PeriodRecord(3600, 5100, 'work', 'finished', 1500,
+                                    1500, 0, 'Write report'))
+        self.store.add(PeriodRecord(5100, 5400, 'short break', 'finished',
+                                    300, 300, 0))
+        self.store.flush()
+        self.assertEqual(self.store.tasks(), ['Email', 'Write report'])
+        self.assertEqual(self.store.query()[0].task, 'Write report')
+
+    def test_events(self):
+        simulator = Simulator(start=10000.0)
+        engine = simulator.engine(work=25, short_break=5)
+        events = []
+        HistoryRecorder(engine, lambda record: None,
+                        wall_clock=simulator.clock,
+                        event_callback=events.append)
+        engine.start()
+        simulator.run_for(60)
+        engine.pause()
+        simulator.run_for(60)
+        engine.resume()
+        engine.skip()
+        self.assertEqual(events, [
+            EventRecord(10000, 'started', 'work'),
+            EventRecord(10060, 'paused', 'work'),
+            EventRecord(10120, 'resumed', 'work'),
+            EventRecord(10120, 'skipped', 'work'),
+            EventRecord(10120, 'started', 'short break'),
+            ])
+
+    def test_compact(self):
+        day = 86400
+        now = time.mktime((2024, 1, 31, 12, 0, 0, 0, 0, -1))
+        for days_ago in range(10):
+            start = now - days_ago * day
+            self.store.add(EventRecord(start, 'started', 'work'))
+            self.store.add(PeriodRecord(start, start + 1500, 'work',
+                                        'finished', 1500, 1500, 0))
+        self.store.flush()
+        # Several passes are needed.
+        self.store.COMPACTION_LIMIT = 2
+        self.store.compact(event_days=2, period_days=5, now=now)
+        self.store.flush()
+
+        self.assertEqual(len(self.store.events()), 3)
+        self.assertEqual(len(self.store.query()), 6)
+        self.assertEqual(len(self.store.daily()), 10)
+        self.store.rebuild_daily()
+        self.assertEqual(len(self.store.daily()), 10)
+        self.assertEqual(sum(day[1] for day in self.store.daily()), 10)
+
+    def test_compact_keeps_daily(self):
+        day = 86400
+        now = time.mktime((2024, 1, 31, 12, 0, 0, 0, 0, -1))
+        for days_ago in range(10):
+            for hour in range(3):
+                start = now - days_ago * day + hour * 3600
+                self.store.add(PeriodRecord(start, start + 1500, 'work',
+                                            'finished', 1500, 1500, 0))
+        self.store.flush()
+        # Rebuild the daily totals after every pass.
+        compact = self.store._HistoryStore__compact
+        rebuild = self.store._HistoryStore__rebuild_daily
+
+        def compact_and_rebuild(connection, compaction):
+            done = compact(connection, compaction)
+            rebuild(connection)
+            return done
+        self.store._HistoryStore__compact = compact_and_rebuild
+        self.store.COMPACTION_LIMIT = 2
+        self.store.compact(event_days=None, period_days=5, now=now)
+        self.store.flush()
+
+        self.assertEqual(len(self.store.query()), 18)
+        self.assertEqual(self.store.daily()[0][1], 3)
+        self.assertEqual(sum(day[1] for day in self.store.daily()), 30)
+
+    def test_migrate(self):
+        path = os.path.join(self.tempdir, 'old.sqlite')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE periods (id INTEGER PRIMARY KEY, start REAL, '
+            'end REAL, period TEXT, outcome TEXT, planned REAL, actual REAL, '
+            'pauses INTEGER)'
+            )
+        connection.execute("INSERT INTO periods VALUES "
+                           "(1, 0, 1500, 'work', 'finished', 1500, 1500, 0)")
+        connection.commit()
+        connection.close()
+        store = HistoryStore(path)
+        store.open()
+        self.assertEqual(store.query()[0].task, None)
+        store.close()
+
+
+class TestTaskIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TaskIndex(['Write report', 'Email', 'Review PR',
+                                'write tests'])
+
+    def test_search(self):
+        # Prefix matches first, most recently used first.
+        self.assertEqual(self.index.search('wri'),
+                         ['write tests', 'Write report'])
+        self.assertEqual(self.index.search('report'), ['Write report'])
+        # Typos still match.
+        self.assertEqual(self.index.search('reveiw')[0], 'Review PR')
+        self.assertEqual(self.index.search('xyz'), [])
+        self.assertEqual(self.index.search(''),
+                         ['write tests', 'Review PR', 'Email', 'Write report'])
+
+    def test_add(self):
+        version = self.index.version
+        self.index.add('Write Report')
+        self.assertNotEqual(self.index.version, version)
+        self.assertEqual(len(self.index), 4)
+        self.assertIn('WRITE REPORT', self.index)
+        self.assertEqual(self.index.search('wri'),
+                         ['Write Report', 'write tests'])
+        self.assertEqual(self.index.recent(1), ['Write Report'])
+
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.rollups = Rollups()
+        # Noon of Wednesday, 2024-01-03 in local time.
+        self.now = time.mktime((2024, 1, 3, 12, 0, 0, 0, 0, -1))
+
+    def add(self, days_ago, outcome='finished', period='work', actual=1500):
+        start = self.now - days_ago * 86400
+        self.rollups.add(PeriodRecord(start, start + actual, period, outcome,
+                                      1500, actual, 0))
+
+    def test_totals(self):
+        self.add(0)
+        self.add(0, outcome='skipped', actual=600)
+        self.add(0, period='short break', actual=300)
+        self.add(2)
+        self.add(3)
+        self.assertEqual(self.rollups.day(self.now), (1, 2100))
+        self.assertEqual(self.rollups.week(self.now), (2, 3600))
+        self.assertEqual(self.rollups.month(self.now), (2, 3600))
+
+    def test_streak(self):
+        self.add(1)
+        self.add(2)
+        self.assertEqual(self.rollups.streak(self.now), 2)
+        self.add(0)
+        self.assertEqual(self.rollups.streak(self.now), 3)
+        # Filling a gap joins the older streak.
+        self.add(4)
+        self.add(5)
+        self.add(3)
+        self.assertEqual(self.rollups.streak(self.now), 6)
+        self.assertEqual(self.rollups.streak(self.now + 3 * 86400), 0)
+
+    def test_from_history(self):
+        tempdir = tempfile.mkdtemp()
+        store = HistoryStore(os.path.join(tempdir, 'kamatis.sqlite'))
+        store.open()
+        for days_ago in (0, 0, 1):
+            start = self.now - days_ago * 86400
+            store.add(PeriodRecord(start, start + 1500, 'work', 'finished',
+                                   1500, 1500, 0))
+        store.flush()
+        store.rebuild_daily()
+        rollups = Rollups.from_history(store)
+        store.close()
+        shutil.rmtree(tempdir)
+        self.assertEqual(rollups.day(self.now), (2, 3000))
+        self.assertEqual(rollups.streak(self.now), 2)
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            PeriodRecord(0, 1500, 'work', 'finished', 1500, 1500, 0),
+            PeriodRecord(1500, 1800, 'short break', 'skipped', 300, 300, 1),
+            ]
+
+    def test_csv(self):
+        stream = io.StringIO()
+        self.assertEqual(export.write_csv(self.records, stream), 2)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], ','.join(export.FIELDS))
+        self.assertTrue(lines[2].endswith(',short break,skipped,300,300,1,'))
+        # Local times with their UTC offset.
+        start = lines[1].split(',')[0]
+        self.assertIn(start[-6], '+-')
+        self.assertEqual(importer.parse_timestamp(start), 0)
+
+    def test_jsonl(self):
+        stream = io.StringIO()
+        export.write_jsonl(self.records, stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[1])['period'], 'short break')
+
+    def test_ics(self):
+        stream = io.StringIO()
+        export.write_ics(self.records, stream)
+        text = stream.getvalue()
+        self.assertTrue(text.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('DTSTART:19700101T000000Z\r\n', text)
+        self.assertIn('SUMMARY:Short break (skipped)\r\n', text)
+        self.assertEqual(text.count('BEGIN:VEVENT'), 2)
+
+    def test_ics_folding(self):
+        task = 'Write the quarterly report, then send it to \u00e9quipe ' * 3
+        records = [PeriodRecord(0, 1500, 'work', 'finished', 1500, 1500, 0,
+                                task)]
+        stream = io.StringIO()
+        export.write_ics(records, stream)
+        lines = stream.getvalue().split('\r\n')
+        for line in lines:
+            self.assertLessEqual(len(line.encode('utf-8')), 75)
+        # Unfolding gives back the whole summary.
+        text = stream.getvalue().replace('\r\n ', '')
+        self.assertIn('SUMMARY:Work (finished): {}\r\n'.format(
+            task.replace(',', '\\,')), text)
+
+
+class TestImporter(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.store = HistoryStore(os.path.join(self.tempdir, 'kamatis.sqlite'))
+        self.store.open()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_normalize(self):
+        record = importer.normalize({
+            'Started At': '1970-01-01T00:25:00Z',
+            'Minutes': '25',
+            'Type': 'Pomodoro',
+            'Status': 'Completed',
+            })
+        self.assertEqual(record, PeriodRecord(
+            1500, 3000, 'work', 'finished', 1500, 1500, 0))
+        # Milliseconds.
+        record = importer.normalize({'start': 1500000000000,
+                                     'end': 1500000300000,
+                                     'kind': 'short_break'})
+        self.assertEqual(record[:3], (1500000000, 1500000300, 'short break'))
+        self.assertRaises(ValueError, importer.normalize, {'start': 0})
+
+    def test_json(self):
+        stream = io.StringIO(
+            u' [{"start": 0, "duration": 1500},\n {"start": 1500, '
+            u'"duration": 300, "type": "break"}]')
+        rows = list(importer.iter_rows(stream))
+        self.assertEqual(len(rows), 2)
+        stream = io.StringIO(u'{"start": 0}\n{"start": 1}\n')
+        self.assertEqual(len(list(importer.iter_rows(stream))), 2)
+
+    def test_import(self):
+        self.store.add(PeriodRecord(3000, 4500, 'work', 'finished', 1500,
+                                    1500, 0))
+        stream = io.StringIO(
+            u'start,end,type\n'
+            u'6000,7500,work\n'
+            u'0,1500,work\n'
+            u'4000,5000,work\n'  # Overlaps the stored period.
+            u'2000,3500,work\n'  # Overlaps it as well.
+            u'0,1500,work\n'  # Imported twice.
+            u'bogus,,\n'
+            )
+        result = importer.import_history(self.store, [stream], batch_size=1)
+        self.assertEqual(result, (6, 2, 1))
+        starts = [record.start for record in self.store.query()]
+        self.assertEqual(starts, [0, 3000, 6000])
+        self.assertEqual(sum(day[1] for day in self.store.daily()), 3)
+
+
+@unittest.skipUnless(analytics, 'NumPy is not installed')
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'kamatis.sqlite')
+        self.store = HistoryStore(self.path)
+        self.store.open()
+        self.columns = analytics.ColumnarHistory(
+            os.path.join(self.tempdir, 'columns'))
+        # 09:00 of Wednesday, 2024-01-03 in local time.
+        self.start = time.mktime((2024, 1, 3, 9, 0, 0, 0, 0, -1))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tempdir)
+
+    def add(self, offset, outcome='finished', period='work', actual=1500):
+        start = self.start + offset
+        self.store.add(PeriodRecord(start, start + actual, period, outcome,
+                                    1500, actual, 0))
+        self.store.flush()
+
+    def test_update(self):
+        self.assertEqual(len(self.columns), 0)
+        self.add(0)
+        self.add(1800, period='short break', actual=300)
+        self.assertEqual(self.columns.update(self.path), 2)
+        self.add(3600, outcome='skipped', actual=600)
+        self.assertEqual(self.columns.update(self.path), 1)
+        self.assertEqual(self.columns.update(self.path), 0)
+        columns = self.columns.load()
+        self.assertEqual(list(columns['actual']), [1500, 300, 600])
+
+        # Deleted rows are dropped without reading the others again.
+        self.store.insert([])
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute('DELETE FROM periods WHERE id = 1')
+        connection.close()
+        self.add(5400, actual=900)
+        self.assertEqual(self.columns.update(self.path), 1)
+        columns = self.columns.load()
+        self.assertEqual(list(columns['id']), [2, 3, 4])
+        self.assertEqual(list(columns['actual']), [300, 600, 900])
+
+        # Rows added below the last id force a rebuild.
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute(
+                'INSERT INTO periods (id, start, end, period, outcome, '
+                'planned, actual) '
+                "VALUES (1, 0, 1500, 'work', 'finished', 1500, 1500)")
+        connection.close()
+        self.assertEqual(self.columns.update(self.path), 4)
+        self.assertEqual(len(self.columns), 4)
+
+    def test_reports(self):
+        self.add(0)
+        self.add(1800, outcome='skipped', actual=600)
+        self.add(86400, outcome='reset', actual=100)
+        self.add(2400, period='short break', actual=300)
+        self.columns.update(self.path)
+        columns = self.columns.load()
+
+        heatmap = analytics.heatmap(columns)
+        self.assertEqual(heatmap.shape, (7, 24))
+        self.assertEqual(heatmap[2, 9], 2100)
+        self.assertEqual(heatmap[3, 9], 100)
+        self.assertEqual(heatmap.sum(), 2200)
+        self.assertAlmostEqual(analytics.completion_ratio(columns), 1 / 3.0)
+        self.assertAlmostEqual(analytics.interruption_rate(columns),
+                               2 / 3.0)
+        self.assertEqual(
+            analytics.outcome_rates(columns, 'short break')['finished'], 1)
+        self.assertEqual(analytics.count(columns), 3)
+        self.assertEqual(analytics.count(columns, None), 4)
+
+    def test_stats_command(self):
+        from kamatis import cli
+
+        self.add(0)
+        self.add(1800, outcome='skipped', actual=600)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli.main(['kamatis', '--database', self.path, 'stats'])
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[:5], [
+            'Work periods: 2',
+            'Finished: 50%',
+            'Skipped: 50%',
+            'Reset: 0%',
+            'Interrupted: 50%',
+            ])
+        # Wednesday at 9.
+        self.assertEqual(lines[-5][:4 + 9 * 3 + 2], 'Wed' + ' ' * 28 + '@@')
+        self.assertTrue(os.path.isdir(
+            os.path.join(self.tempdir, 'kamatis.columns')))
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(1000.0)
+        self.scheduler = Scheduler(clock=self.clock)
+        self.fired = []
+
+    def callback(self, name):
+        return lambda: self.fired.append(name)
+
+    def test_order(self):
+        first = self.scheduler.timeline()
+        second = self.scheduler.timeline()
+        first.call_at(20, self.callback('a20'))
+        second.call_at(10, self.callback('b10'), precise=True)
+        first.call_at(5, self.callback('a5'))
+        self.assertEqual(self.scheduler.next_event(), (1005, False))
+        self.clock.advance(30)
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, ['a5', 'b10', 'a20'])
+        self.assertIsNone(self.scheduler.next_event())
+
+    def test_cancel(self):
+        timeline = self.scheduler.timeline()
+        event = timeline.call_at(5, self.callback('a5'))
+        timeline.call_at(10, self.callback('a10'))
+        timeline.cancel(event)
+        self.clock.advance(10)
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, ['a10'])
+
+    def test_pause_resume(self):
+        timeline = self.scheduler.timeline()
+        other = self.scheduler.timeline()
+        timeline.call_at(10, self.callback('a10'))
+        other.call_at(200, self.callback('b200'))
+        self.clock.advance(5)
+        timeline.pause()
+        self.assertEqual(self.scheduler.next_timeout(), 195)
+        self.clock.advance(100)
+        self.assertEqual(timeline.now(), 5)
+        timeline.resume()
+        self.assertEqual(self.scheduler.next_timeout(), 5)
+        self.clock.advance(5)
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, ['a10'])
+        self.clock.advance(90)
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, ['a10', 'b200'])
+
+
+class TestTimerEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(1000.0)
+        self.engine = TimerEngine(clock=self.clock)
+        self.engine.configure(work=25, short_break=5, long_break=15, cycle=2)
+        self.events = []
+        self.engine.state_changed.connect(
+            lambda state: self.events.append(('state', state)))
+        self.engine.period_changed.connect(
+            lambda period: self.events.append(('period', period)))
+        self.engine.period_ended.connect(
+            lambda period, outcome: self.events.append((outcome, period)))
+
+    def advance(self, secs):
+        self.clock.advance(secs)
+        self.engine.update()
+
+    def test_start(self):
+        self.engine.start()
+        self.assertEqual(self.engine.state, 'RUNNING')
+        self.assertEqual(self.engine.period, 'work')
+        self.assertEqual(self.engine.progress, 0)
+        self.assertEqual(self.engine.get_remaining_time(), 25 * 60)
+        # Nobody listens to progress, so only the period end is scheduled.
+        self.assertEqual(self.engine.next_timeout(), 25 * 60)
+
+    def test_cycle(self):
+        self.engine.start()
+        periods = [self.engine.period]
+        for _ in range(5):
+            self.advance(self.engine.get_remaining_time())
+            periods.append(self.engine.period)
+        self.assertEqual(periods, [
+            'work',
+            'short break',
+            'work',
+            'short break',
+            'work',
+            'long break',
+            ])
+
+    def test_late_update_does_not_drift(self):
+        self.engine.start()
+        self.advance(25 * 60 + 10)
+        self.assertEqual(self.engine.period, 'short break')
+        self.assertEqual(self.engine.get_remaining_time(), 5 * 60 - 10)
+
+    def test_progress(self):
+        self.engine.start()
+        progress = []
+        self.engine.period_progressed.connect(progress.append)
+        self.assertEqual(self.engine.next_timeout(), 25 * 60 / 12.0)
+        while self.engine.period == 'work':
+            self.advance(self.engine.next_timeout())
+        self.assertEqual(progress, list(range(1, 12)) + [0])
+
+    def test_pause_resume(self):
+        self.engine.start()
+        self.advance(60)
+        self.engine.pause()
+        self.assertIsNone(self.engine.next_timeout())
+        self.advance(600)
+        self.assertEqual(self.engine.get_remaining_time(), 24 * 60)
+        self.engine.resume()
+        self.assertEqual(self.engine.get_remaining_time(), 24 * 60)
+
+    def test_skip_while_paused(self):
+        self.engine.start()
+        self.engine.pause()
+        del self.events[:]
+        self.engine.skip()
+        self.assertEqual(self.events, [
+            ('state', 'RUNNING'),
+            ('skipped', 'work'),
+            ('period', 'short break'),
+            ])
+
+    def test_reset(self):
+        self.engine.start()
+        self.advance(25 * 60)
+        self.engine.reset()
+        self.assertEqual(self.events[-2:], [
+            ('reset', 'short break'),
+            ('state', 'STOPPED'),
+            ])
+        self.assertEqual(self.engine.period_counter, 0)
+        self.assertIsNone(self.engine.get_remaining_time())
+
+    def test_consistent_on_state_changed(self):
+        remaining = []
+        self.engine.state_changed.connect(
+            lambda state: remaining.append(self.engine.get_remaining_time()))
+        self.engine.start()
+        self.engine.restore('RUNNING', 'short break', 1, 120, 300)
+        self.engine.restore('PAUSED', 'work', 1, 600, 1500)
+        self.assertEqual(remaining, [25 * 60, 120, 600, 600])
+        self.assertEqual(self.events[:2], [
+            ('state', 'RUNNING'),
+            ('period', 'work'),
+            ])
+
+    def test_sleep_pause(self):
+        self.engine.start()
+        self.engine.suspended(3600, 'pause')
+        self.assertEqual(self.engine.state, 'PAUSED')
+        self.assertEqual(self.engine.get_remaining_time(), 25 * 60)
+
+    def test_sleep_during_work_counts_as_break(self):
+        self.engine.start()
+        self.advance(60)
+        self.engine.suspended(60, 'break')
+        self.assertEqual(self.engine.period, 'short break')
+        self.assertEqual(self.engine.get_remaining_time(), 4 * 60)
+
+    def test_sleep_through_break(self):
+        self.engine.start()
+        self.advance(25 * 60 + 60)
+        self.engine.suspended(3600, 'break')
+        self.assertEqual(self.engine.period, 'work')
+        self.assertEqual(self.engine.get_remaining_time(), 25 * 60)
+
+
+class TestSimulator(unittest.TestCase):
+
+    def test_scenario(self):
+        simulator = Simulator()
+        engine = simulator.engine(work=25, short_break=5, cycle=1)
+        events = simulator.record(engine)
+        engine.start()
+        simulator.call_at(27 * 60, engine.pause)
+        simulator.call_at(37 * 60, engine.resume)
+        simulator.call_at(45 * 60, engine.skip)
+        simulator.run_for(3599)
+
+        self.assertEqual(events[0], (0.0, 'state_changed', ('RUNNING',)))
+        periods = [(when, args[0]) for when, name, args in events
+                   if name == 'period_changed']
+        self.assertEqual(periods, [
+            (0.0, 'work'),
+            (25 * 60, 'short break'),
+            (40 * 60, 'work'),
+            (45 * 60, 'long break'),
+            ])
+        steps = [(when, args[0]) for when, name, args in events
+                 if name == 'period_progressed']
+        self.assertEqual(steps[:12], [(i * 125.0, i) for i in range(12)])
+        self.assertEqual(simulator.clock(), 3599)
+
+
+class TestSessionManager(unittest.TestCase):
+
+    def test_independent_sessions(self):
+        simulator = Simulator()
+        manager = SessionManager(scheduler=simulator.scheduler)
+        changes = []
+        manager.period_changed.connect(
+            lambda session_id, period: changes.append((session_id, period)))
+        manager.create('alice', work=25)
+        manager.create('bob', work=50)
+        self.assertRaises(ValueError, manager.create, 'bob')
+        self.assertEqual(len(manager), 2)
+
+        simulator.run_for(30 * 60)
+        manager.pause('bob')
+        simulator.run_for(60 * 60)
+        self.assertEqual(manager.query('bob'), {
+            'state': 'PAUSED',
+            'period': 'work',
+            'period_counter': 0,
+            'progress': 7,
+            'remaining': 20 * 60,
+            })
+        self.assertEqual(manager.query('alice')['state'], 'RUNNING')
+        self.assertEqual(changes[2:4], [
+            ('alice', 'short break'),
+            ('alice', 'work'),
+            ])
+
+        manager.remove('alice')
+        self.assertNotIn('alice', manager)
+
+
+class TestSleepDetector(unittest.TestCase):
+
+    def test_check(self):
+        monotonic = VirtualClock(100.0)
+        boottime = VirtualClock(150.0)
+        detector = SleepDetector(monotonic=monotonic, boottime=boottime)
+        monotonic.advance(10)
+        boottime.advance(10.001)
+        self.assertEqual(detector.check(), 0)
+        boottime.advance(600)
+        self.assertAlmostEqual(detector.check(), 600.001)
+        self.assertEqual(detector.check(), 0)
+
+
+class TestStartupProfile(unittest.TestCase):
+
+    def test_phases(self):
+        clock = VirtualClock(10.0)
+        profile = StartupProfile(clock=clock)
+        with profile.phase('imports'):
+            clock.advance(0.5)
+        clock.advance(0.25)
+        with profile.phase('tray_icon'):
+            with profile.phase('icon'):
+                clock.advance(0.125)
+        report = json.loads(json.dumps(profile.as_dict()))
+        self.assertEqual(report['total_ms'], 875.0)
+        self.assertEqual(
+            [(phase['name'], phase['start_ms'], phase['duration_ms'])
+             for phase in report['phases']],
+            [
+                ('imports', 0.0, 500.0),
+                ('tray_icon', 750.0, 125.0),
+                ('icon', 750.0, 125.0),
+                ],
+            )
+
+    def test_write(self):
+        profile = StartupProfile(clock=VirtualClock(1000.0))
+        stream = io.StringIO()
+        profile.write(stream)
+        self.assertEqual(json.loads(stream.getvalue())['phases'], [])
+
+    def test_null(self):
+        self.assertFalse(NULL_PROFILE)
+        with NULL_PROFILE.phase('imports'):
+            pass
+
+
+@unittest.skipUnless(PyQt5, 'PyQt5 is not installed')
+class TestQSettingsManager(unittest.TestCase):
+
+    def setUp(self):
+        from PyQt5.QtCore import (
+            QCoreApplication,
+            QSettings,
+            )
+
+        # The manager syncs with a timer, which needs an application.
+        self.app = None
+        if QCoreApplication.instance() is None:
+            self.app = QCoreApplication([])
+        self.tempdir = tempfile.mkdtemp()
+        self.organization = QCoreApplication.organizationName()
+        QCoreApplication.setOrganizationName('KamatisTests')
+        QSettings.setDefaultFormat(QSettings.IniFormat)
+        QSettings.setPath(QSettings.IniFormat, QSettings.UserScope,
+                          self.tempdir)
+        self.QSettings = QSettings
+
+    def tearDown(self):
+        from PyQt5.QtCore import QCoreApplication
+
+        QCoreApplication.setOrganizationName(self.organization)
+        self.QSettings.setDefaultFormat(self.QSettings.NativeFormat)
+        shutil.rmtree(self.tempdir)
+        self.app = None
+        gc.collect()
+
+    def test_get(self):
+        from kamatis.ext.pyqtconfig import QSettingsManager
+
+        manager = QSettingsManager()
+        manager.set_defaults({'work': 25, 'entries': []})
+        self.assertEqual(manager.get('work'), 25)
+        manager.settings.setValue('work', '30')
+        # Only our own writes are noticed before a sync.
+        self.assertEqual(manager.get('work'), 25)
+        manager.sync()
+        self.assertEqual(manager.get('work'), 30)
+
+        manager.set('entries', [('a', 'b')])
+        manager.get('entries').append(('c', 'd'))
+        self.assertEqual(manager.get('entries'), [('a', 'b')])
+
+    def test_set(self):
+        from kamatis.ext.pyqtconfig import QSettingsManager
+
+        manager = QSettingsManager()
+        manager.set_defaults({'work': 25, 'autostart': True})
+        manager.set_many({'work': 40, 'autostart': False})
+        self.assertEqual(manager.get('work'), 40)
+        self.assertEqual(manager.get('autostart'), False)
+        self.assertEqual(manager.as_dict(), {'work': 40, 'autostart': False})
+
+        manager.sync()
+        other = self.QSettings()
+        self.assertEqual(int(other.value('work')), 40)
+
+        other.setValue('work', 50)
+        other.sync()
+        manager.sync()
+        self.assertEqual(manager.get('work'), 50)
+
+    def test_watch(self):
+        from PyQt5.QtCore import QCoreApplication
+        from kamatis.ext.pyqtconfig import QSettingsManager
+
+        manager = QSettingsManager()
+        manager.set_defaults({'work': 25})
+        manager.set('work', 40)
+        manager.sync()
+        self.assertEqual(manager.get('work'), 40)
+
+        for work in (50, 60):
+            other = self.QSettings()
+            other.setValue('work', work)
+            other.sync()
+            deadline = time.time() + 5
+            while manager.get('work') != work and time.time() < deadline:
+                QCoreApplication.processEvents()
+                time.sleep(0.01)
+            # Noticed without a sync, also after the file was replaced.
+            self.assertEqual(manager.get('work'), work)
+
+
+@unittest.skipUnless(PyQt5, 'PyQt5 is not installed')
+class KamatisTestCase(unittest.TestCase):
+    """Runs the app offscreen, with a fake clock and a temporary home."""
+
+    def setUp(self):
+        from PyQt5.QtCore import QSettings
+
+        self.tempdir = tempfile.mkdtemp()
+        self.environ = dict(os.environ)
+        os.environ.update(
+            HOME=self.tempdir,
+            XDG_CONFIG_HOME=os.path.join(self.tempdir, 'config'),
+            XDG_DATA_HOME=os.path.join(self.tempdir, 'data'),
+            QT_QPA_PLATFORM='offscreen',
+            )
+        # QSettings only looks the path up once per process.
+        QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope,
+                          os.environ['XDG_CONFIG_HOME'])
+        self.clock = VirtualClock(1000.0)
+        self.app = None
+
+    def tearDown(self):
+        self.stop_app()
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.tempdir)
+
+    def add_tray_icon(self):
+        from kamatis.tray_icon import TrayIcon
+
+        return TrayIcon(self.app)
+
+    def start_app(self):
+        from kamatis.app import Kamatis
+
+        self.stop_app()
+        self.app = Kamatis(['kamatis'], clock=self.clock)
+        return self.app
+
+    def stop_app(self):
+        if self.app is None:
+            return
+        # What quitting the event loop would do.
+        self.app.aboutToQuit.emit()
+        self.delete_windows()
+        self.app = None
+        gc.collect()
+
+    def delete_windows(self):
+        from PyQt5 import sip
+        from kamatis.settings_window import SettingsWindow
+        from kamatis.tray_icon import TrayIcon
+
+        # Tray menus and settings windows have no parent and must not
+        # outlive the app, even when a failed test still refers to them.
+        for tray_icon in self.app.findChildren(TrayIcon):
+            sip.delete(tray_icon.contextMenu())
+            sip.delete(tray_icon)
+        for widget in self.app.topLevelWidgets():
+            if isinstance(widget, SettingsWindow):
+                sip.delete(widget)
+
+
+class TestKamatis(KamatisTestCase):
+
+    # Tests keep no references of their own to the app, there can only be
+    # one at a time.
+
+    def test_start(self):
+        self.start_app()
+        self.assertEqual(self.app.get_remaining_time(), 0)
+        self.app.start()
+        self.clock.advance(60)
+        self.assertEqual(self.app.get_remaining_time(), 24 * 60 * 1000)
+
+    def test_remaining_time_only_reads(self):
+        self.start_app()
+        self.app.start()
+        periods = []
+        self.app.period_changed.connect(periods.append)
+        self.clock.advance(26 * 60)
+        # The period is over but only the timer moves on to the break.
+        self.assertEqual(self.app.get_remaining_time(), 0)
+        self.assertEqual(periods, [])
+
+    def test_compact_history(self):
+        self.start_app()
+        old = time.time() - 1000 * 86400
+        self.app.history.insert([PeriodRecord(old, old + 1500, 'work',
+                                              'finished', 1500, 1500, 0)])
+        self.app.start()
+        self.app.skip()
+        # Recording a period also compacts, without waiting for a timer.
+        self.app.history.flush()
+        self.assertEqual([record.outcome
+                          for record in self.app.history.query()],
+                         ['skipped'])
+
+    def test_restore(self):
+        self.start_app()
+        self.app.start()
+        self.clock.advance(60)
+        self.app.pause()
+        self.start_app()
+        # Paused periods do not go on while the app is not running.
+        self.assertEqual(self.app.get_remaining_time(), 24 * 60 * 1000)
+
+    def test_restore_running(self):
+        self.start_app()
+        self.app.start()
+        self.start_app()
+        remaining = self.app.get_remaining_time()
+        self.assertLessEqual(remaining, 25 * 60 * 1000)
+        self.assertGreater(remaining, 24 * 60 * 1000)
+
+    def test_without_qtdbus(self):
+        # None in sys.modules makes importing it fail.
+        saved = sys.modules.get('PyQt5.QtDBus')
+        sys.modules['PyQt5.QtDBus'] = None
+        try:
+            with self.assertLogs(level='WARNING') as logs:
+                self.start_app()
+        finally:
+            if saved is None:
+                del sys.modules['PyQt5.QtDBus']
+            else:
+                sys.modules['PyQt5.QtDBus'] = saved
+        self.assertIn('Cannot watch for sleep', '\n'.join(logs.output))
+        self.app.start()
+        self.clock.advance(60)
+        self.assertEqual(self.app.get_remaining_time(), 24 * 60 * 1000)
+
+
+class TestResources(KamatisTestCase):
+
+    def setUp(self):
+        from PyQt5.QtCore import QResource
+        from kamatis import resources
+
+        super(TestResources, self).setUp()
+        # The app registers the resources from the file, once for every
+        # app made in the tests so far.
+        self.start_app()
+        self.path = os.path.join(os.path.dirname(resources.__file__),
+                                 resources.RCC_NAME)
+        while QResource.unregisterResource(self.path):
+            pass
+
+    def tearDown(self):
+        from PyQt5.QtCore import QResource
+
+        QResource.registerResource(self.path)
+        super(TestResources, self).tearDown()
+
+    def get_sizes(self, icon):
+        return sorted(size.width() for size in icon.availableSizes())
+
+    def test_register(self):
+        from PyQt5.QtCore import QFile
+        from kamatis import resources
+
+        self.assertFalse(QFile.exists(':/kamatis.svg'))
+        self.assertTrue(resources.register())
+        self.assertTrue(QFile.exists(':/kamatis.svg'))
+        self.assertEqual(self.get_sizes(resources.get_icon()),
+                         list(resources.ICON_PIXELS))
+
+    def test_register_data(self):
+        from PyQt5.QtCore import (
+            QFile,
+            QResource,
+            )
+        from kamatis import resources
+
+        # As when the bundle is inside a zip and cannot be mapped.
+        class UnmappableResource(QResource):
+
+            @staticmethod
+            def registerResource(path):
+                return False
+
+        resources.QResource = UnmappableResource
+        try:
+            self.assertTrue(resources.register())
+        finally:
+            resources.QResource = QResource
+        self.assertTrue(QFile.exists(':/kamatis.svg'))
+        self.assertEqual(len(resources.get_icon().availableSizes()),
+                         len(resources.ICON_PIXELS))
+        data = vars(resources)['__data'].pop()
+        self.assertTrue(QResource.unregisterResourceData(data))
+
+    def test_get_icon(self):
+        from kamatis import resources
+
+        self.assertTrue(resources.register())
+        # Without the PNGs the icon is drawn from the SVG.
+        template = resources.ICON_TEMPLATE
+        resources.ICON_TEMPLATE = ':/icons/missing-{}.png'
+        try:
+            icon = resources.get_icon()
+        finally:
+            resources.ICON_TEMPLATE = template
+        self.assertEqual(self.get_sizes(icon), [])
+        self.assertEqual(icon.pixmap(22, 22).width(), 22)
+
+
+class TestIconRenderer(KamatisTestCase):
+
+    def setUp(self):
+        super(TestIconRenderer, self).setUp()
+        self.start_app()
+
+    def get_alphas(self, pixmap):
+        # Right, left and bottom of the tomato at 22 px.
+        image = pixmap.toImage()
+        return [image.pixelColor(x, y).alpha()
+                for x, y in ((16, 12), (5, 12), (11, 18))]
+
+    def test_get_frame(self):
+        from kamatis.icon_renderer import IconRenderer
+
+        renderer = IconRenderer()
+        self.assertEqual(renderer.get_frame_count(22), 69)
+        self.assertEqual(renderer.get_frame_count(0), 1)
+        self.assertEqual(renderer.get_frame(0.0, 22), 0)
+        self.assertEqual(renderer.get_frame(0.014, 22), 0)
+        self.assertEqual(renderer.get_frame(0.015, 22), 1)
+        self.assertEqual(renderer.get_frame(0.5, 22), 34)
+        self.assertEqual(renderer.get_frame(1.0, 22), 68)
+
+    def test_render(self):
+        from kamatis.icon_renderer import IconRenderer
+
+        renderer = IconRenderer()
+        pixmap = renderer.render('normal', 0, 22)
+        self.assertEqual((pixmap.width(), pixmap.height()), (22, 22))
+        self.assertEqual(self.get_alphas(pixmap), [255, 255, 255])
+        self.assertEqual(pixmap.toImage().pixelColor(11, 12).name(),
+                         '#dd2e44')
+
+        # Half way through, the right half is cut away clockwise.
+        pixmap = renderer.render('normal', 34, 22)
+        alphas = self.get_alphas(pixmap)
+        self.assertEqual(alphas[:2], [0, 255])
+        self.assertLess(alphas[2], 255)
+
+        pixmap = renderer.render('paused', 0, 22)
+        self.assertEqual(pixmap.toImage().pixelColor(11, 12).name(),
+                         '#555555')
+
+        pixmap = renderer.render('normal', 0, 44, 2.0)
+        self.assertEqual(pixmap.width(), 44)
+        self.assertEqual(pixmap.devicePixelRatio(), 2.0)
+
+
+class TestIconCache(KamatisTestCase):
+
+    def setUp(self):
+        super(TestIconCache, self).setUp()
+        self.start_app()
+
+    def test_pixmap(self):
+        from kamatis.icon_cache import IconCache
+
+        # 50 frames differ at 16 px, so each lasts for 2% of the period.
+        cache = IconCache(sizes=(16,), max_frames=3)
+        pixmap = cache.pixmap('normal', 0.0, 16, 1.0)
+        self.assertEqual(pixmap.width(), 16)
+        self.assertIs(cache.pixmap('normal', 0.019, 16, 1.0), pixmap)
+        self.assertIsNot(cache.pixmap('normal', 0.021, 16, 1.0), pixmap)
+        self.assertIsNot(cache.pixmap('paused', 0.0, 16, 1.0), pixmap)
+        self.assertEqual(len(cache), 3)
+
+        # The least recently used frame goes first.
+        self.assertIs(cache.pixmap('normal', 0.0, 16, 1.0), pixmap)
+        cache.pixmap('normal', 0.5, 16, 1.0)
+        self.assertEqual(len(cache), 3)
+        self.assertIs(cache.pixmap('normal', 0.0, 16, 1.0), pixmap)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNot(cache.pixmap('normal', 0.0, 16, 1.0), pixmap)
+
+    def test_icon(self):
+        from kamatis.icon_cache import IconCache
+
+        cache = IconCache(sizes=(16, 22), max_frames=4)
+        icon = cache.icon('normal', 0.0, 1.0)
+        self.assertEqual(len(cache), 2)
+        sizes = sorted(size.width() for size in icon.availableSizes())
+        self.assertEqual(sizes, [16, 22])
+        # Fractions that look the same at every size give the same icon.
+        self.assertIs(cache.icon('normal', 0.01, 1.0), icon)
+        self.assertIsNot(cache.icon('normal', 0.5, 1.0), icon)
+        self.assertIsNot(cache.icon('normal', 0.0, 2.0), icon)
+        self.assertEqual(len(cache), 4)
+        # Two icons fit in four frames, the first is made again.
+        self.assertIsNot(cache.icon('normal', 0.0, 1.0), icon)
+
+
+class TestTrayIcon(KamatisTestCase):
+
+    def setUp(self):
+        super(TestTrayIcon, self).setUp()
+        self.start_app()
+
+    def get_timer(self, tray_icon, timer_type):
+        from PyQt5.QtCore import QTimer
+
+        timers = [timer for timer in tray_icon.findChildren(QTimer)
+                  if timer.timerType() == timer_type]
+        self.assertEqual(len(timers), 1)
+        return timers[0]
+
+    def get_visible_texts(self, menu):
+        return [action.text() for action in menu.actions()
+                if action.isVisible() and not action.isSeparator()]
+
+    def test_menu(self):
+        from PyQt5.QtCore import Qt
+
+        tray_icon = self.add_tray_icon()
+        menu = tray_icon.contextMenu()
+        timer = self.get_timer(tray_icon, Qt.PreciseTimer)
+        actions = menu.actions()
+        menu.aboutToShow.emit()
+        self.assertEqual(self.get_visible_texts(menu),
+                         ['Start', 'Task: none', 'Settings', 'Quit'])
+        self.assertFalse(timer.isActive())
+
+        self.app.start()
+        self.assertEqual(self.get_visible_texts(menu), [
+            'Pause', 'Skip', 'Reset', 'Work', '25:00 to go', 'Task: none',
+            'Settings', 'Quit',
+            ])
+        # The countdown ticks while the menu is open.
+        self.assertEqual(timer.interval(), 1000)
+        self.clock.advance(1.5)
+        timer.timeout.emit()
+        self.assertIn('24:58 to go', self.get_visible_texts(menu))
+        self.assertEqual(timer.interval(), 500)
+
+        self.app.pause()
+        self.assertIn('Work - paused', self.get_visible_texts(menu))
+        self.assertFalse(timer.isActive())
+        self.app.resume()
+        self.assertTrue(timer.isActive())
+        menu.aboutToHide.emit()
+        self.assertFalse(timer.isActive())
+        # The menu is only updated in place.
+        self.assertEqual(menu.actions(), actions)
+
+    def test_task_menu(self):
+        tray_icon = self.add_tray_icon()
+        menu = [action.menu() for action in tray_icon.contextMenu().actions()
+                if action.menu() is not None][0]
+        actions = menu.actions()
+        menu.aboutToShow.emit()
+        self.assertEqual(self.get_visible_texts(menu),
+                         ['No task', 'Choose...'])
+
+        self.app.set_task('Read')
+        self.app.set_task('Write & test')
+        menu.aboutToShow.emit()
+        self.assertEqual(self.get_visible_texts(menu),
+                         ['No task', 'Write && test', 'Read', 'Choose...'])
+        checked = [action.text() for action in menu.actions()
+                   if action.isChecked()]
+        self.assertEqual(checked, ['Write && test'])
+
+        read = [action for action in menu.actions()
+                if action.text() == 'Read'][0]
+        read.trigger()
+        self.assertEqual(self.app.task, 'Read')
+        menu.aboutToShow.emit()
+        self.assertEqual(self.get_visible_texts(menu),
+                         ['No task', 'Read', 'Write && test', 'Choose...'])
+        self.assertEqual(menu.actions(), actions)
+
+    def test_tooltip(self):
+        from PyQt5.QtCore import (
+            QEvent,
+            Qt,
+            )
+
+        tray_icon = self.add_tray_icon()
+        timer = self.get_timer(tray_icon, Qt.VeryCoarseTimer)
+        self.app.start()
+        self.assertIn('\n25:00 to go\n', tray_icon.toolTip())
+        # Without tooltip events it is refreshed on minute boundaries.
+        self.assertTrue(timer.isActive())
+        self.assertEqual(timer.interval(), 60 * 1000)
+        self.clock.advance(60)
+        timer.timeout.emit()
+        self.assertIn('\n24:00 to go\n', tray_icon.toolTip())
+
+        self.clock.advance(30)
+        tray_icon.event(QEvent(QEvent.ToolTip))
+        self.assertIn('\n23:30 to go\n', tray_icon.toolTip())
+        self.assertFalse(timer.isActive())
+
+        self.app.pause()
+        self.assertIn('\n23:30 to go\n', tray_icon.toolTip())
+        self.app.reset()
+        self.assertNotIn('to go', tray_icon.toolTip())
+
+
+class TestSettingsWindow(KamatisTestCase):
+
+    def get_windows(self):
+        return [widget for widget in self.app.topLevelWidgets()
+                if widget.windowTitle() == 'Kamatis Settings']
+
+    def test_release(self):
+        from PyQt5.QtCore import (
+            QCoreApplication,
+            QEvent,
+            QTimer,
+            )
+
+        self.start_app()
+        self.assertEqual(self.get_windows(), [])
+        self.assertEqual(self.app.settings.handlers, {})
+        self.app.show_settings()
+        self.assertEqual(len(self.get_windows()), 1)
+        self.assertIn('work', self.app.settings.handlers)
+        self.assertIn('chosen_sound', self.app.settings.handlers)
+
+        timer = [timer for timer in self.app.findChildren(QTimer)
+                 if timer.interval() == self.app.SETTINGS_WINDOW_KEEP][0]
+        self.get_windows()[0].close()
+        self.assertTrue(timer.isActive())
+        # Reopening it in time keeps the window.
+        self.app.show_settings()
+        self.assertFalse(timer.isActive())
+        self.get_windows()[0].close()
+        timer.timeout.emit()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        self.assertEqual(self.get_windows(), [])
+        self.assertEqual(self.app.settings.handlers, {})
+
+        # The settings stay and the next window shows them.
+        self.app.settings.set('work', 30)
+        self.app.show_settings()
+        handler = self.app.settings.handlers['work']
+        self.assertEqual(handler.value(), 30)
+
+
+class TestSignals(KamatisTestCase):
+
+    # Runs the app in its event loop, telling when it is idle and when it
+    # reloads the settings.
+    SCRIPT = '''
+import sys
+from PyQt5.QtWidgets import QApplication
+from kamatis import app
+
+def on_started():
+    instance = QApplication.instance()
+    reload_settings = instance.reload_settings
+
+    def on_reload():
+        reload_settings()
+        print('reloaded')
+        sys.stdout.flush()
+
+    instance.reload_settings = on_reload
+    print('started')
+    sys.stdout.flush()
+
+app.main(['kamatis'], on_started=on_started)
+'''
+
+    def run_app(self, *signums):
+        # The signals are sent while the event loop waits in Qt, so they are
+        # only handled if they wake it up.
+        process = subprocess.Popen(
+            [sys.executable, '-c', self.SCRIPT],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+        timer = threading.Timer(30, process.kill)
+        timer.start()
+        try:
+            lines = [process.stdout.readline().strip()]
+            for signum in signums:
+                time.sleep(0.2)
+                process.send_signal(signum)
+                if signum == signal.SIGHUP:
+                    lines.append(process.stdout.readline().strip())
+            process.stdout.close()
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+        return lines, returncode
+
+    def test_quit(self):
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.assertEqual(self.run_app(signum), (['started'], 0))
+
+    def test_reload(self):
+        self.assertEqual(self.run_app(signal.SIGHUP, signal.SIGTERM),
+                         (['started', 'reloaded'], 0))
+
+
+class TestProfileStartup(KamatisTestCase):
+
+    # Without QtDBus a warning is logged while starting up.
+    SCRIPT = '''
+import sys
+sys.modules['PyQt5.QtDBus'] = None
+from kamatis import cli
+cli.main(['kamatis', '--profile-startup'])
+'''
+
+    def test_stdout(self):
+        process = subprocess.Popen(
+            [sys.executable, '-c', self.SCRIPT],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+        timer = threading.Timer(30, process.kill)
+        timer.start()
+        try:
+            # The app keeps running once the report is written.
+            lines = []
+            for line in iter(process.stdout.readline, ''):
+                lines.append(line)
+                if line == '}\n':
+                    break
+            process.terminate()
+            _, stderr = process.communicate()
+        finally:
+            timer.cancel()
+        report = json.loads(''.join(lines))
+        names = [phase['name'] for phase in report['phases']]
+        self.assertEqual(names[0], 'imports')
+        self.assertIn('tray_icon', names)
+        self.assertIn('Cannot watch for sleep without QtDBus.', stderr)
+
+
+@unittest.skipUnless(PyQt5, 'PyQt5 is not installed')
+@unittest.skipUnless(sys.version_info >= (3, 7), 'needs -X importtime')
+class TestImportTime(unittest.TestCase):
+
+    # Cumulative import time of kamatis.app allowed, as a multiple of that
+    # of the Qt modules it cannot do without, which is about 1.8 times on a
+    # desktop. Relative to Qt it does not depend on the speed of the machine.
+    BUDGET = 2.5
+    QT_MODULES = ('PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets')
+    # Modules that are only needed once the user asks for them.
+    DEFERRED = (
+        'PyQt5.QtMultimedia',
+        'PyQt5.QtNetwork',
+        'kamatis.settings_window',
+        'kamatis.sound_combo_box',
+        'kamatis.task_picker',
+        )
+
+    def get_import_times(self):
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', 'import kamatis.app'],
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+        times = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:') or '[us]' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative) / 1e6
+        return times
+
+    def test_deferred(self):
+        times = self.get_import_times()
+        self.assertIn('kamatis.app', times)
+        for name in self.DEFERRED:
+            self.assertNotIn(name, times)
+
+    def test_budget(self):
+        # The best of a few runs, to leave out a cold disk cache.
+        ratios = []
+        for _ in range(3):
+            times = self.get_import_times()
+            qt = sum(times[name] for name in self.QT_MODULES)
+            ratios.append(times['kamatis.app'] / qt)
+        self.assertLess(min(ratios), self.BUDGET)
+
+
 if __name__ == '__main__':
     unittest.main()
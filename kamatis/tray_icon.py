@@ -1,13 +1,22 @@
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import (
+    QEvent,
+    Qt,
+    QTimer,
+    )
 from PyQt5.QtWidgets import (
     QApplication,
     QMenu,
     QSystemTrayIcon,
     )
 
+from kamatis.icon_cache import IconCache
+
 
 class TrayIcon(QSystemTrayIcon):
 
+    # Recently used tasks listed in the task menu.
+    RECENT_TASKS = 10
+
     def __init__(self, parent):
         super(TrayIcon, self).__init__(parent)
         self.__app = QApplication.instance()
@@ -22,30 +31,51 @@ class TrayIcon(QSystemTrayIcon):
             'PAUSED': (self.__app.resume, 'Resume'),
             }
 
+        self.__icon_cache = IconCache()
         self.__init_icon()
 
-        menu = QMenu()
-        menu.aboutToShow.connect(self.__populate_menu)
-        self.setContextMenu(menu)
+        self.__app_state = 'STOPPED'
+        self.__period_str = ''
+        self.__task_picker = None
+        self.__init_menu()
+
+        # Refreshes the tooltip countdown on minute boundaries, only until
+        # the tray tells us that the tooltip is about to be shown. Trays
+        # that do not, like StatusNotifierItem ones, need it all the time.
+        self.__tooltip_events = False
+        self.__tooltip_timer = QTimer(self)
+        self.__tooltip_timer.setSingleShot(True)
+        self.__tooltip_timer.setTimerType(Qt.VeryCoarseTimer)
+        self.__tooltip_timer.timeout.connect(self.__update_tooltip)
 
         self.activated.connect(self.__on_activated)
 
     def __init_icon(self):
-        self.__icon_template = ':/kamatis-{}.png'
-        self.__period_step = 0
+        self.__icon_variant = 'normal'
+        self.__fraction = 0.0
+        self.__icon = None
         self.__set_icon()
 
     def __set_normal_icon(self):
-        self.__icon_template = ':/kamatis-{}.png'
+        self.__icon_variant = 'normal'
         self.__set_icon()
 
     def __set_paused_icon(self):
-        self.__icon_template = ':/kamatis-paused-{}.png'
+        self.__icon_variant = 'paused'
         self.__set_icon()
 
     def __set_icon(self):
-        icon = QIcon(self.__icon_template.format(self.__period_step))
-        self.setIcon(icon)
+        icon = self.__icon_cache.icon(self.__icon_variant, self.__fraction)
+        # Steps too small to show at the tray size give back the same icon.
+        if icon is not self.__icon:
+            self.__icon = icon
+            self.setIcon(icon)
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            self.__tooltip_events = True
+            self.__update_tooltip()
+        return super(TrayIcon, self).event(event)
 
     def __on_activated(self, reason):
         if reason == QSystemTrayIcon.Trigger:
@@ -66,6 +96,10 @@ class TrayIcon(QSystemTrayIcon):
             self.__set_period_str('{}{}'.format(self.__period_str, pause_str))
             self.__set_paused_icon()
 
+        if self.__menu_shown:
+            self.__update_menu()
+            self.__update_countdown()
+
     def __on_period_changed(self, new_period):
         self.__set_period_str(new_period.capitalize())
 
@@ -75,7 +109,7 @@ class TrayIcon(QSystemTrayIcon):
         self.showMessage(app_name, message, msecs=timeout)
 
     def __on_period_progressed(self, progress):
-        self.__period_step = progress
+        self.__fraction = float(progress) / self.__app.PERIOD_STEPS
         self.__set_icon()
 
     def __on_quit(self):
@@ -83,41 +117,181 @@ class TrayIcon(QSystemTrayIcon):
 
     def __set_period_str(self, period_str):
         self.__period_str = period_str
-        text = '{}\n{}'.format(self.__app.applicationName(), period_str)
-        self.setToolTip(text.strip())
-
-    def __populate_menu(self):
-        menu = self.contextMenu()
-        menu.clear()
-
-        on_trigger, text = self.__state_actions_dict[self.__app_state]
-        action = menu.addAction(text)
-        action.triggered.connect(on_trigger)
+        self.__set_action_text(self.__period_action, period_str)
+        self.__update_tooltip()
 
+    def __update_tooltip(self):
+        remaining_text = ''
+        self.__tooltip_timer.stop()
         if self.__app_state in ('RUNNING', 'PAUSED'):
             remaining_time = self.__app.get_remaining_time()
             remaining_text = self.__get_remaining_text(remaining_time)
+            if self.__app_state == 'RUNNING' and not self.__tooltip_events:
+                self.__tooltip_timer.start(remaining_time % 60000 or 60000)
+        lines = (
+            self.__app.applicationName(),
+            self.__period_str,
+            remaining_text,
+            self.__get_stats_text(),
+            )
+        tooltip = '\n'.join(line for line in lines if line)
+        if tooltip != self.toolTip():
+            self.setToolTip(tooltip)
 
-            skip = menu.addAction('Skip')
-            skip.triggered.connect(self.__app.skip)
+    def __get_stats_text(self):
+        stats = self.__app.stats
+        pomodoros, focus = stats.day()
+        text = 'Today: {} pomodoro{}, {} min of focus'.format(
+            pomodoros,
+            '' if pomodoros == 1 else 's',
+            int(focus / 60),
+            )
+        streak = stats.streak()
+        if streak > 1:
+            text = '{}\nStreak: {} days'.format(text, streak)
+        return text
 
-            reset = menu.addAction('Reset')
-            reset.triggered.connect(self.__app.reset)
+    def __init_menu(self):
+        # Built once, __update_menu() only touches what changed.
+        menu = QMenu()
+        menu.aboutToShow.connect(self.__on_menu_about_to_show)
+        menu.aboutToHide.connect(self.__on_menu_about_to_hide)
 
-            menu.addSeparator()
-            period = menu.addAction(self.__period_str)
-            period.setEnabled(False)
-            min_sec = menu.addAction(remaining_text)
-            min_sec.setEnabled(False)
+        self.__toggle_action = menu.addAction('Start')
+        self.__toggle_action.triggered.connect(self.__on_toggle)
+
+        skip = menu.addAction('Skip')
+        skip.triggered.connect(self.__app.skip)
+        reset = menu.addAction('Reset')
+        reset.triggered.connect(self.__app.reset)
+        separator = menu.addSeparator()
+        self.__period_action = menu.addAction('')
+        self.__period_action.setEnabled(False)
+        self.__remaining_action = menu.addAction('')
+        self.__remaining_action.setEnabled(False)
+        # Only shown while a period is running or paused.
+        self.__period_actions = (
+            skip,
+            reset,
+            separator,
+            self.__period_action,
+            self.__remaining_action,
+            )
 
         menu.addSeparator()
+        self.__init_task_menu(menu)
         settings = menu.addAction('Settings')
-        settings.triggered.connect(self.__app.settings_window.show)
+        settings.triggered.connect(self.__on_settings)
 
         menu.addSeparator()
         quit = menu.addAction('Quit')
         quit.triggered.connect(self.__on_quit)
 
+        self.__menu_shown = False
+        self.setContextMenu(menu)
+
+        # Updates the countdown while the menu is open, on every change of
+        # the seconds shown.
+        self.__countdown_timer = QTimer(self)
+        self.__countdown_timer.setSingleShot(True)
+        self.__countdown_timer.setTimerType(Qt.PreciseTimer)
+        self.__countdown_timer.timeout.connect(self.__update_countdown)
+
+    def __init_task_menu(self, menu):
+        task_menu = QMenu(menu)
+        task_menu.aboutToShow.connect(self.__update_task_menu)
+        task_menu.triggered.connect(self.__on_task_triggered)
+        self.__no_task_action = task_menu.addAction('No task')
+        self.__no_task_action.setCheckable(True)
+        task_menu.addSeparator()
+        # One action per recent task, hidden until there is a task for it.
+        self.__task_actions = []
+        for _ in range(self.RECENT_TASKS):
+            action = task_menu.addAction('')
+            action.setCheckable(True)
+            action.setVisible(False)
+            self.__task_actions.append(action)
+        task_menu.addSeparator()
+        choose = task_menu.addAction('Choose...')
+        choose.triggered.connect(self.__show_task_picker)
+        menu.addMenu(task_menu)
+        self.__task_menu = task_menu
+        self.__task_index_version = None
+
+    def __on_menu_about_to_show(self):
+        self.__menu_shown = True
+        self.__update_menu()
+        self.__update_countdown()
+
+    def __on_menu_about_to_hide(self):
+        self.__menu_shown = False
+        self.__countdown_timer.stop()
+
+    def __on_toggle(self):
+        self.__on_trigger()
+
+    def __on_settings(self):
+        self.__app.show_settings()
+
+    def __set_action_text(self, action, text):
+        if action.text() != text:
+            action.setText(text)
+
+    def __update_menu(self):
+        _, text = self.__state_actions_dict[self.__app_state]
+        self.__set_action_text(self.__toggle_action, text)
+        in_period = self.__app_state in ('RUNNING', 'PAUSED')
+        for action in self.__period_actions:
+            if action.isVisible() != in_period:
+                action.setVisible(in_period)
+        self.__set_action_text(self.__period_action, self.__period_str)
+        task = self.__app.task or 'none'
+        self.__task_menu.setTitle('Task: {}'.format(task.replace('&', '&&')))
+
+    def __update_countdown(self):
+        self.__countdown_timer.stop()
+        if self.__app_state not in ('RUNNING', 'PAUSED'):
+            return
+        remaining_time = self.__app.get_remaining_time()
+        remaining_text = self.__get_remaining_text(remaining_time)
+        self.__set_action_text(self.__remaining_action, remaining_text)
+        if self.__app_state == 'RUNNING' and self.__menu_shown:
+            # Wake up when the seconds shown change, not at a fixed rate.
+            self.__countdown_timer.start(remaining_time % 1000 or 1000)
+
+    def __update_task_menu(self):
+        index = self.__app.get_task_index()
+        if index.version != self.__task_index_version:
+            self.__task_index_version = index.version
+            tasks = index.recent(self.RECENT_TASKS)
+            for i, action in enumerate(self.__task_actions):
+                task = tasks[i] if i < len(tasks) else None
+                if action.data() != task:
+                    action.setData(task)
+                    self.__set_action_text(action, (task or '').replace(
+                        '&', '&&'))
+                if action.isVisible() != (task is not None):
+                    action.setVisible(task is not None)
+        task = self.__app.task
+        self.__no_task_action.setChecked(task is None)
+        for action in self.__task_actions:
+            action.setChecked(task is not None and action.data() == task)
+
+    def __on_task_triggered(self, action):
+        if action is self.__no_task_action:
+            self.__app.set_task(None)
+        elif action in self.__task_actions:
+            self.__app.set_task(action.data())
+
+    def __show_task_picker(self):
+        if self.__task_picker is None:
+            from kamatis.task_picker import TaskPicker
+
+            self.__task_picker = TaskPicker()
+        self.__task_picker.show()
+        self.__task_picker.raise_()
+        self.__task_picker.activateWindow()
+
     def __get_remaining_text(self, msecs):
         secs = int(msecs / 1000)
         mins, secs = divmod(secs, 60)
@@ -26,3 +26,12 @@ def makedirs(path):
         logging.warning('Cannot create {}.'.format(path), exc_info=exc_info)
 
     return isdir
+
+
+def get_data_dir(organization='Fumisoft', application='Kamatis'):
+    # Same as QStandardPaths.AppLocalDataLocation on Linux, for code paths
+    # that must not load Qt.
+    data_home = os.environ.get('XDG_DATA_HOME')
+    if not data_home:
+        data_home = os.path.expanduser('~/.local/share')
+    return os.path.join(data_home, organization, application)
@@ -46,9 +46,15 @@ def main():
             ),
         license='BSD',
         packages=find_packages('.'),
+        package_data={
+            'kamatis': ['res.rcc'],
+            },
+        extras_require={
+            'analytics': ['numpy'],
+            },
         entry_points={
             'console_scripts': [
-                'kamatis=kamatis.app:main',
+                'kamatis=kamatis.cli:main',
                 ],
             },
         )
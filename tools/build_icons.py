@@ -0,0 +1,103 @@
+"""Render kamatis.svg to PNGs at the common icon sizes.
+
+The PNGs go to res/icons along with res/icons.qrc listing them, which
+tools/build_resources.py packs into kamatis/res.rcc next to res.qrc. Sizes
+cover 16 to 48 px at device pixel ratios of 1 and 2, and the window icon
+picks the one matching its size instead of scaling. The tray icon is not
+made from these, it is drawn from the SVG as the period progresses.
+
+Prints the size of each PNG and the time to decode it compared to
+rendering the SVG at that size.
+
+Needs PyQt5 with QtSvg and runs without a display.
+
+Usage: python tools/build_icons.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import (  # noqa
+    QRectF,
+    Qt,
+    )
+from PyQt5.QtGui import (  # noqa
+    QGuiApplication,
+    QImage,
+    QPainter,
+    )
+from PyQt5.QtSvg import QSvgRenderer  # noqa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, 'res', 'images', 'kamatis.svg')
+OUTPUT_DIR = os.path.join(ROOT, 'res', 'icons')
+QRC_PATH = os.path.join(ROOT, 'res', 'icons.qrc')
+
+# Keep in line with kamatis.icon_cache.ICON_SIZES.
+SIZES = (16, 22, 24, 32, 48)
+RATIOS = (1, 2)
+
+# Keep in line with kamatis.resources.ICON_TEMPLATE.
+TEMPLATE = 'kamatis-{}.png'
+
+
+def get_pixel_sizes():
+    return sorted(set(size * ratio for size in SIZES for ratio in RATIOS))
+
+
+def render(svg, pixels):
+    image = QImage(pixels, pixels, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    svg.render(painter, QRectF(0, 0, pixels, pixels))
+    painter.end()
+    return image
+
+
+def time_call(function, repeat=200):
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - started) * 1e6 / repeat
+
+
+def main():
+    app = QGuiApplication(sys.argv[:1])  # noqa
+    if not os.path.isdir(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+    svg = QSvgRenderer(SOURCE)
+
+    entries = []
+    total = 0
+    print('{:<24} {:>6} {:>10} {:>10}'.format(
+        'file', 'bytes', 'decode us', 'svg us'))
+    for pixels in get_pixel_sizes():
+        name = TEMPLATE.format(pixels)
+        path = os.path.join(OUTPUT_DIR, name)
+        image = render(svg, pixels)
+        # PNG quality only sets the compression level, 0 is the highest.
+        image.convertToFormat(QImage.Format_ARGB32).save(path, 'PNG', 0)
+        entries.append(name)
+        size = os.path.getsize(path)
+        total += size
+        print('{:<24} {:>6} {:>10.1f} {:>10.1f}'.format(
+            name,
+            size,
+            time_call(lambda: QImage(path)),
+            time_call(lambda: render(svg, pixels)),
+            ))
+    print('{} files, {} bytes'.format(len(entries), total))
+
+    with open(QRC_PATH, 'w') as f:
+        f.write('<!DOCTYPE RCC><RCC version="1.0">\n')
+        f.write('<qresource prefix="/icons">\n')
+        for name in entries:
+            f.write('    <file alias="{0}">icons/{0}</file>\n'.format(name))
+        f.write('</qresource>\n</RCC>\n')
+
+
+if __name__ == '__main__':
+    main()
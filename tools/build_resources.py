@@ -0,0 +1,76 @@
+"""Compile res.qrc and res/icons.qrc into kamatis/res.rcc.
+
+Needs PyQt5. pyrcc5 only writes Python modules, so the module it generates
+is evaluated here and its data blobs are written out in the binary format
+of `rcc -binary`, which Qt can memory-map. The version 1 format is used as
+it has no file times, so the same sources always give the same bundle.
+
+Run tools/build_icons.py first to update res/icons.qrc.
+
+Usage: python tools/build_resources.py
+"""
+import os
+import struct
+import tempfile
+
+from PyQt5 import pyrcc_main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+QRC_PATHS = (
+    os.path.join(ROOT, 'res.qrc'),
+    os.path.join(ROOT, 'res', 'icons.qrc'),
+    )
+RCC_PATH = os.path.join(ROOT, 'kamatis', 'res.rcc')
+
+
+def compile_python(qrc_paths):
+    """Return the blobs of the Python module pyrcc5 makes of `qrc_paths`."""
+    fd, py_path = tempfile.mkstemp(suffix='.py')
+    os.close(fd)
+    try:
+        if not pyrcc_main.processResourceFile(list(qrc_paths), py_path,
+                                              False):
+            raise SystemExit('Cannot compile {}'.format(
+                ', '.join(qrc_paths)))
+        with open(py_path) as f:
+            source = f.read()
+    finally:
+        os.remove(py_path)
+
+    # Evaluate only the data, without registering anything.
+    source = source.split('\nqt_version = ')[0]
+    namespace = {}
+    exec(compile(source, py_path, 'exec'), namespace)
+    return (
+        namespace['qt_resource_struct_v1'],
+        namespace['qt_resource_name'],
+        namespace['qt_resource_data'],
+        )
+
+
+def write_rcc(path, tree, names, data, version=1):
+    """Write a binary resource file like `rcc -binary` does."""
+    header_size = 20
+    data_offset = header_size
+    names_offset = data_offset + len(data)
+    tree_offset = names_offset + len(names)
+    with open(path, 'wb') as f:
+        f.write(b'qres')
+        f.write(struct.pack('>IIII', version, tree_offset, data_offset,
+                            names_offset))
+        f.write(data)
+        f.write(names)
+        f.write(tree)
+
+
+def main():
+    qrc_paths = [path for path in QRC_PATHS if os.path.exists(path)]
+    tree, names, data = compile_python(qrc_paths)
+    write_rcc(RCC_PATH, tree, names, data)
+    print('Wrote {} ({} bytes)'.format(RCC_PATH, os.path.getsize(RCC_PATH)))
+
+
+if __name__ == '__main__':
+    main()